@@ -1,14 +1,45 @@
-from flask import Flask
+from flask import Flask, jsonify
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from flask_cors import CORS
 
 from .config import Config
 from .models.database import db
-from .models.face_recognition import FaceRecognitionSystem
+from .models.gallery import EncodingVersionMismatch, GalleryCache
+from .models.inference_pool import InferencePool, InferencePoolFull
 
 # Initialize face recognition system
-face_recognition_system = FaceRecognitionSystem()
+if Config.USE_MODEL_STUBS:
+    from .models.stubs import StubFaceRecognitionSystem
+    face_recognition_system = StubFaceRecognitionSystem(
+        detect_ms=Config.STUB_DETECT_MS,
+        embed_ms=Config.STUB_EMBED_MS
+    )
+else:
+    from .models.face_recognition import FaceRecognitionSystem
+    face_recognition_system = FaceRecognitionSystem(
+        backend=Config.INFERENCE_BACKEND,
+        intra_op_threads=Config.INTRA_OP_THREADS,
+        inter_op_threads=Config.INTER_OP_THREADS,
+        onnx_path=Config.ONNX_MODEL_PATH,
+        batch_window_ms=Config.FACENET_BATCH_WINDOW_MS,
+        max_batch_size=Config.FACENET_MAX_BATCH_SIZE,
+        detection_cascade=Config.DETECTION_CASCADE,
+        cascade_model_path=Config.DETECTION_CASCADE_MODEL,
+        cascade_config_path=Config.DETECTION_CASCADE_CONFIG,
+        cascade_padding=Config.DETECTION_CASCADE_PADDING,
+        cascade_skip_empty=Config.DETECTION_CASCADE_SKIP_EMPTY
+    )
+
+# Stored face encodings shared by all matching code; serves the active version,
+# and only while it is the version this process embeds probes with
+gallery_cache = GalleryCache(model_version=face_recognition_system.encoding_version)
+
+# Bounded pool running CPU-heavy inference for all requests
+inference_pool = InferencePool(
+    max_workers=Config.INFERENCE_POOL_WORKERS,
+    max_queue=Config.INFERENCE_QUEUE_LIMIT
+)
 
 def create_app(config_class=Config):
     app = Flask(__name__)
@@ -26,4 +57,19 @@ def create_app(config_class=Config):
     app.register_blueprint(main_bp)
     app.register_blueprint(admin_bp, url_prefix='/admin')
     
+    # Shed load instead of queueing unbounded inference work
+    @app.errorhandler(InferencePoolFull)
+    def handle_inference_pool_full(e):
+        response = jsonify({'error': 'Server is busy, please retry later'})
+        response.status_code = 503
+        response.headers['Retry-After'] = '1'
+        return response
+    
+    # Never match or enroll with embeddings of another version than the active one
+    @app.errorhandler(EncodingVersionMismatch)
+    def handle_encoding_version_mismatch(e):
+        response = jsonify({'error': str(e)})
+        response.status_code = 503
+        return response
+    
     return app 
\ No newline at end of file
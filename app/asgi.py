@@ -0,0 +1,231 @@
+import json
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from asgiref.sync import sync_to_async
+from asgiref.wsgi import WsgiToAsgi, WsgiToAsgiInstance
+from . import gallery_cache, inference_pool
+from .models.gallery import EncodingVersionMismatch
+from .models.image_decoding import ImageDecodeError, decode_base64_image
+from .models.inference_pool import InferencePoolFull
+
+class ThreadedWsgiToAsgi(WsgiToAsgi):
+    """
+    WSGI adapter running each request on a thread pool.
+
+    asgiref's WsgiToAsgi runs the app thread-sensitively, i.e. all requests one
+    at a time on a single thread, so one slow view (such as an enrollment
+    waiting for the inference pool) would stall every other Flask route.
+
+    Attributes:
+        executor (ThreadPoolExecutor): Pool the WSGI app runs on
+    """
+    def __init__(self, wsgi_application, executor: ThreadPoolExecutor):
+        """
+        Initialize the adapter
+
+        Args:
+            wsgi_application (Callable): WSGI application
+            executor (ThreadPoolExecutor): Pool the WSGI app runs on
+        """
+        super().__init__(wsgi_application)
+        self.executor = executor
+
+    async def __call__(self, scope, receive, send):
+        """ASGI entry point"""
+        instance = WsgiToAsgiInstance(self.wsgi_application, self.duplicate_header_limit)
+        # Replace the thread-sensitive wrapper with one running on our pool
+        instance.run_wsgi_app = sync_to_async(
+            functools.partial(WsgiToAsgiInstance.__dict__['run_wsgi_app'].func, instance),
+            thread_sensitive=False,
+            executor=self.executor
+        )
+        await instance(scope, receive, send)
+
+class AsyncApp:
+    """
+    ASGI application serving the Flask app in async mode.
+
+    The recognition endpoint is handled natively: the request body is read on the
+    event loop; JSON parsing, image decoding, gallery loading and dump writes run
+    on an I/O thread pool; and only detection, embedding and emotion detection
+    run on the bounded inference pool, answering 503 when it is full. All other
+    routes are served by the Flask app through a WSGI adapter whose views run
+    concurrently on their own thread pool and submit inference to the same
+    bounded pool.
+
+    Attributes:
+        flask_app (Flask): The wrapped Flask application
+        wsgi (ThreadedWsgiToAsgi): ASGI adapter for the Flask routes
+        io_executor (ThreadPoolExecutor): Pool for parsing, decoding and database work
+        wsgi_executor (ThreadPoolExecutor): Pool running the Flask views
+    """
+    RECOGNIZE_PATH = '/api/recognize'
+
+    def __init__(self, flask_app, io_workers: int = 4, wsgi_workers: int = 8):
+        """
+        Initialize the ASGI application
+
+        Args:
+            flask_app (Flask): Flask application created by create_app()
+            io_workers (int): Threads for request parsing, image decoding and database work
+            wsgi_workers (int): Threads running the Flask views
+        """
+        self.flask_app = flask_app
+        self.io_executor = ThreadPoolExecutor(io_workers, thread_name_prefix='io')
+        self.wsgi_executor = ThreadPoolExecutor(wsgi_workers, thread_name_prefix='wsgi')
+        self.wsgi = ThreadedWsgiToAsgi(flask_app, self.wsgi_executor)
+        self.max_content_length = flask_app.config.get('MAX_CONTENT_LENGTH')
+
+    async def __call__(self, scope, receive, send):
+        """ASGI entry point"""
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        elif scope['type'] == 'http' and scope['path'] == self.RECOGNIZE_PATH and scope['method'] == 'POST':
+            await self._recognize(receive, send)
+        else:
+            await self.wsgi(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        """Handle server startup and shutdown"""
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.io_executor.shutdown(wait=False)
+                self.wsgi_executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _read_body(self, receive):
+        """
+        Read the request body
+
+        Returns:
+            Optional[bytes]: Request body, or None if it exceeds MAX_CONTENT_LENGTH
+        """
+        chunks = []
+        size = 0
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return b''
+            chunk = message.get('body', b'')
+            size += len(chunk)
+            if self.max_content_length and size > self.max_content_length:
+                return None
+            chunks.append(chunk)
+            if not message.get('more_body', False):
+                return b''.join(chunks)
+
+    def _decode_request(self, body: bytes):
+        """
+        Parse the JSON body and decode its base64 image
+
+        Args:
+            body (bytes): Request body
+
+        Returns:
+            Tuple[Optional[Tuple[numpy.ndarray, float]], Optional[str]]: Decoded BGR image
+                and its scale to the uploaded image, or an error message
+        """
+        try:
+            image_data = json.loads(body).get('image')
+        except (ValueError, AttributeError):
+            return None, 'Invalid JSON body'
+        if not image_data:
+            return None, 'No image data provided'
+
+        try:
+            return decode_base64_image(
+                image_data,
+                max_bytes=self.max_content_length,
+                target_size=self.flask_app.config['IMAGE_DECODE_TARGET_SIZE'],
+                max_pixels=self.flask_app.config['MAX_IMAGE_PIXELS']
+            ), None
+        except ImageDecodeError as e:
+            return None, str(e)
+
+    def _in_app_context(self, fn, *args):
+        """Run a function inside an app context, for database work on I/O threads"""
+        with self.flask_app.app_context():
+            return fn(*args)
+
+    async def _recognize(self, receive, send):
+        """Handle POST /api/recognize with the same responses as the Flask view"""
+        from .routes.main import analyze_image, finish_recognition
+
+        loop = asyncio.get_running_loop()
+
+        body = await self._read_body(receive)
+        if body is None:
+            await self._send_json(send, 413, {'error': 'Request body too large'})
+            return
+
+        try:
+            decoded, error = await loop.run_in_executor(self.io_executor, self._decode_request, body)
+            if error:
+                await self._send_json(send, 400, {'error': error})
+                return
+            image, scale = decoded
+
+            # Database work stays on the I/O pool, so inference slots only run models
+            gallery = await loop.run_in_executor(self.io_executor, self._in_app_context, gallery_cache.get)
+            detected, candidates = await inference_pool.run_async(analyze_image, image, gallery)
+            results = await loop.run_in_executor(
+                self.io_executor, self._in_app_context, finish_recognition, detected, candidates, scale
+            )
+        except InferencePoolFull:
+            await self._send_json(send, 503, {'error': 'Server is busy, please retry later'},
+                                  headers=[(b'retry-after', b'1')])
+            return
+        except EncodingVersionMismatch as e:
+            await self._send_json(send, 503, {'error': str(e)})
+            return
+        except Exception as e:
+            print(f"Error in recognize_face: {str(e)}")
+            await self._send_json(send, 500, {'error': str(e)})
+            return
+
+        await self._send_json(send, 200, {'faces': results})
+
+    @staticmethod
+    async def _send_json(send, status: int, payload: dict, headers=None):
+        """
+        Send a JSON response
+
+        Args:
+            send (Callable): ASGI send callable
+            status (int): HTTP status code
+            payload (dict): JSON payload
+            headers (Optional[list]): Extra (name, value) byte header pairs
+        """
+        body = json.dumps(payload).encode('utf-8')
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [
+                (b'content-type', b'application/json'),
+                (b'content-length', str(len(body)).encode('ascii')),
+                (b'access-control-allow-origin', b'*'),
+                *(headers or [])
+            ]
+        })
+        await send({'type': 'http.response.body', 'body': body})
+
+def create_asgi_app(flask_app) -> AsyncApp:
+    """
+    Wrap a Flask application for async serving
+
+    Args:
+        flask_app (Flask): Flask application created by create_app()
+
+    Returns:
+        AsyncApp: ASGI application
+    """
+    return AsyncApp(
+        flask_app,
+        io_workers=flask_app.config.get('ASGI_IO_WORKERS', 4),
+        wsgi_workers=flask_app.config.get('ASGI_WSGI_WORKERS', 8)
+    )
@@ -13,12 +13,48 @@ class Config:
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     
     # Face Recognition
-    FACE_RECOGNITION_THRESHOLD = 0.6  # Threshold for face matching confidence
+    FACE_RECOGNITION_THRESHOLD = float(os.getenv('FACE_RECOGNITION_THRESHOLD', '0.6'))  # Threshold for face matching confidence
     FACE_DETECTION_CONFIDENCE = 0.9   # Threshold for face detection confidence
     
+    # Inference
+    USE_MODEL_STUBS = os.getenv('USE_MODEL_STUBS', '0') == '1'  # Replace all models with stubs (load tests)
+    STUB_DETECT_MS = float(os.getenv('STUB_DETECT_MS', '0'))  # Simulated detection time per image for stubs
+    STUB_EMBED_MS = float(os.getenv('STUB_EMBED_MS', '0'))  # Simulated embedding time per face for stubs
+    INFERENCE_BACKEND = os.getenv('INFERENCE_BACKEND', 'eager')  # 'eager', 'torchscript', 'quantized' or 'onnx'
+    INTRA_OP_THREADS = int(os.getenv('INTRA_OP_THREADS', '0')) or None  # Threads per operator, 0 keeps default
+    INTER_OP_THREADS = int(os.getenv('INTER_OP_THREADS', '0')) or None  # Threads across operators, 0 keeps default
+    FACENET_BATCH_WINDOW_MS = float(os.getenv('FACENET_BATCH_WINDOW_MS', '0')) or None  # Micro-batching window, 0 disables
+    FACENET_MAX_BATCH_SIZE = int(os.getenv('FACENET_MAX_BATCH_SIZE', '16'))
+    INFERENCE_POOL_WORKERS = int(os.getenv('INFERENCE_POOL_WORKERS', '2'))  # Concurrent inference jobs per process
+    INFERENCE_QUEUE_LIMIT = int(os.getenv('INFERENCE_QUEUE_LIMIT', '8'))  # Waiting jobs before answering 503
+    ONNX_MODEL_PATH = os.getenv('ONNX_MODEL_PATH', os.path.join(os.path.dirname(os.path.dirname(__file__)), 'models', 'facenet_vggface2.onnx'))
+    DETECTION_CASCADE = os.getenv('DETECTION_CASCADE') or None  # Cheap detector before MTCNN: 'haar', 'lbp' or 'dnn'
+    DETECTION_CASCADE_MODEL = os.getenv('DETECTION_CASCADE_MODEL') or None  # Cascade XML or DNN weights, OpenCV's Haar cascade by default
+    DETECTION_CASCADE_CONFIG = os.getenv('DETECTION_CASCADE_CONFIG') or None  # DNN network description (deploy.prototxt)
+    DETECTION_CASCADE_PADDING = float(os.getenv('DETECTION_CASCADE_PADDING', '0.5'))  # Crop padding relative to the proposed face
+    DETECTION_CASCADE_SKIP_EMPTY = os.getenv('DETECTION_CASCADE_SKIP_EMPTY', '0') == '1'  # Skip MTCNN when nothing is proposed
+    
+    # Async serving
+    ASGI_IO_WORKERS = int(os.getenv('ASGI_IO_WORKERS', '4'))  # Threads for request parsing, image decoding and database work
+    ASGI_WSGI_WORKERS = int(os.getenv('ASGI_WSGI_WORKERS', '8'))  # Threads running the other Flask routes
+    
     # File Upload
     UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'uploads')
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
+    MAX_IMAGE_PIXELS = int(os.getenv('MAX_IMAGE_PIXELS', str(64_000_000)))  # Reject larger images before decoding
+    IMAGE_DECODE_TARGET_SIZE = int(os.getenv('IMAGE_DECODE_TARGET_SIZE', '1280'))  # Long side to decode large images down to
+    UPLOAD_CACHE_MAX_AGE = 3600  # Cache lifetime for uploads that may change, in seconds
+    
+    # Face Dumps
+    ENROLLMENT_FOLDER = os.getenv('ENROLLMENT_FOLDER', os.path.join(os.path.dirname(os.path.dirname(__file__)), 'enrollment'))  # Retained enrollment images, never served
+    DUMP_FOLDER = os.getenv('DUMP_FOLDER', os.path.join(UPLOAD_FOLDER, 'dumps'))  # Served at /dumps/
+    DUMP_IMAGE_FORMAT = os.getenv('DUMP_IMAGE_FORMAT', 'webp')  # 'webp' or 'jpg'
+    DUMP_IMAGE_QUALITY = int(os.getenv('DUMP_IMAGE_QUALITY', '80'))
+    DUMP_MAX_CROP_SIZE = int(os.getenv('DUMP_MAX_CROP_SIZE', '0')) or None  # Max crop side in pixels, 0 disables
+    DUMP_CACHE_MAX_AGE = 365 * 24 * 3600  # Content-addressed dumps never change
+    DUMP_DEDUP_SIMILARITY = float(os.getenv('DUMP_DEDUP_SIMILARITY', '0.95'))  # Cosine similarity of near-duplicates
+    DUMP_DEDUP_WINDOW = float(os.getenv('DUMP_DEDUP_WINDOW', '60'))  # Seconds a dump suppresses duplicates, 0 disables
+    DUMP_DEDUP_HISTORY = int(os.getenv('DUMP_DEDUP_HISTORY', '8'))  # Recent embeddings kept per user
     
     # Ensure upload directory exists
     os.makedirs(UPLOAD_FOLDER, exist_ok=True) 
\ No newline at end of file
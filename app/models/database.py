@@ -4,6 +4,10 @@ from flask_sqlalchemy import SQLAlchemy
 
 db = SQLAlchemy()
 
+# Encoding version of rows stored before encodings were versioned
+# (FaceNet vggface2, float32, original preprocessing)
+LEGACY_ENCODING_VERSION = 'vggface2-fp32-p1'
+
 class User(db.Model):
     """
     User model representing a person in the face recognition system.
@@ -18,6 +22,12 @@ class User(db.Model):
     """
     __tablename__ = 'users'
     
+    __table_args__ = (
+        # text_pattern_ops lets PostgreSQL serve LIKE 'prefix%' from the index
+        # regardless of the database collation
+        db.Index('ix_users_name_prefix', 'name', postgresql_ops={'name': 'text_pattern_ops'}),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -25,6 +35,59 @@ class User(db.Model):
     face_encodings = db.relationship('FaceEncoding', backref='user', lazy=True)
     face_dumps = db.relationship('FaceDump', backref='user', lazy=True)
 
+    @classmethod
+    def page_with_face_counts(cls, after_id=None, name_prefix=None, limit=50, model_version=None):
+        """
+        Fetch a page of users together with their face encoding counts
+        
+        The page of users is selected first, then its counts come from one
+        grouped COUNT restricted to those user IDs, so neither query touches
+        more than a page worth of rows and encoding blobs are never loaded.
+        Pages are keyset-paginated on the user ID.
+        
+        Args:
+            after_id (int): Only return users with an ID greater than this
+            name_prefix (str): Only return users whose name starts with this
+            limit (int): Maximum number of users to return
+            model_version (str): Only count encodings of this version
+        
+        Returns:
+            list: Rows of (id, name, face_count) ordered by ID
+        """
+        query = db.session.query(cls.id, cls.name)
+        if after_id is not None:
+            query = query.filter(cls.id > after_id)
+        if name_prefix:
+            query = query.filter(cls.name.startswith(name_prefix, autoescape=True))
+        users = query.order_by(cls.id).limit(limit).all()
+        if not users:
+            return []
+        
+        counts_query = db.session.query(
+            FaceEncoding.user_id,
+            db.func.count(FaceEncoding.id)
+        ).filter(FaceEncoding.user_id.in_([user_id for user_id, _ in users]))
+        if model_version is not None:
+            counts_query = counts_query.filter(FaceEncoding.model_version == model_version)
+        face_counts = dict(counts_query.group_by(FaceEncoding.user_id).all())
+        
+        return [(user_id, name, face_counts.get(user_id, 0)) for user_id, name in users]
+
+    def face_count(self, model_version=None):
+        """
+        Count this user's face encodings without loading them
+        
+        Args:
+            model_version (str): Only count encodings of this version
+        
+        Returns:
+            int: Number of face encodings
+        """
+        query = FaceEncoding.query.filter_by(user_id=self.id)
+        if model_version is not None:
+            query = query.filter_by(model_version=model_version)
+        return query.count()
+
     def __repr__(self):
         """String representation of the User object"""
         return f'<User {self.name}>'
@@ -37,13 +100,23 @@ class FaceEncoding(db.Model):
         id (int): Primary key
         user_id (int): Foreign key to User
         encoding_vector (bytes): Binary storage of face embedding
+        model_version (str): Model and preprocessing version that produced the embedding
+        source_image_path (str): Enrollment image the embedding was computed from, if retained
         created_at (datetime): Timestamp when encoding was created
     """
     __tablename__ = 'face_encodings'
     
+    __table_args__ = (
+        # Serves gallery loads of one version and the re-encoding anti-join
+        db.Index('ix_face_encodings_version_user', 'model_version', 'user_id'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
     encoding_vector = db.Column(db.LargeBinary, nullable=False)  # Store face encoding as binary
+    model_version = db.Column(db.String(64), nullable=False, default=LEGACY_ENCODING_VERSION,
+                              server_default=LEGACY_ENCODING_VERSION)
+    source_image_path = db.Column(db.String(255), nullable=True)  # Relative to ENROLLMENT_FOLDER
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     def set_encoding(self, encoding):
@@ -66,7 +139,7 @@ class FaceEncoding(db.Model):
 
     def __repr__(self):
         """String representation of the FaceEncoding object"""
-        return f'<FaceEncoding user_id={self.user_id}>'
+        return f'<FaceEncoding user_id={self.user_id} version={self.model_version}>'
 
 class FaceDump(db.Model):
     """
@@ -79,6 +152,8 @@ class FaceDump(db.Model):
         bounding_box (str): JSON string of bounding box coordinates [x1, y1, x2, y2]
         emotion (str): Detected emotion
         similarity_score (float): Similarity score with original face
+        embedding (bytes): L2-normalized probe embedding stored as float16, if recorded
+        model_version (str): Model and preprocessing version that produced the embedding
         created_at (datetime): Timestamp when dump was created
     """
     __tablename__ = 'face_dumps'
@@ -89,8 +164,94 @@ class FaceDump(db.Model):
     bounding_box = db.Column(db.String(100), nullable=False)  # JSON string of [x1, y1, x2, y2]
     emotion = db.Column(db.String(50), nullable=False)
     similarity_score = db.Column(db.Float, nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    embedding = db.Column(db.LargeBinary, nullable=True)  # float16 probe embedding (1 KB)
+    model_version = db.Column(db.String(64), nullable=False, default=LEGACY_ENCODING_VERSION,
+                              server_default=LEGACY_ENCODING_VERSION)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    
+    def set_embedding(self, embedding):
+        """
+        Store the probe embedding compactly as a normalized float16 vector
+        
+        Args:
+            embedding (numpy.ndarray): Face embedding vector
+        """
+        embedding = embedding / np.linalg.norm(embedding)
+        self.embedding = embedding.astype(np.float16).tobytes()
+    
+    def get_embedding(self):
+        """
+        Convert the stored probe embedding back to a numpy array
+        
+        Returns:
+            Optional[numpy.ndarray]: Normalized face embedding vector, or None if not recorded
+        """
+        if self.embedding is None:
+            return None
+        return np.frombuffer(self.embedding, dtype=np.float16).astype(np.float32)
     
     def __repr__(self):
         """String representation of the FaceDump object"""
-        return f'<FaceDump user_id={self.user_id} emotion={self.emotion}>' 
\ No newline at end of file
+        return f'<FaceDump user_id={self.user_id} emotion={self.emotion}>'
+
+class EncodingVersion(db.Model):
+    """
+    EncodingVersion model recording encoding versions and which one is active.
+    
+    The active version is the complete, canonical gallery: the one re-encoding
+    migrations start from and the one old versions are pruned against. At most
+    one row is active; activate() switches it with a single UPDATE.
+    
+    Attributes:
+        version (str): Model and preprocessing version, primary key
+        is_active (bool): Whether this is the active version
+        created_at (datetime): Timestamp when the version was first recorded
+        activated_at (datetime): Timestamp when the version was last activated
+    """
+    __tablename__ = 'encoding_versions'
+    
+    version = db.Column(db.String(64), primary_key=True)
+    is_active = db.Column(db.Boolean, nullable=False, default=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    activated_at = db.Column(db.DateTime, nullable=True)
+    
+    @classmethod
+    def active_version(cls, default=LEGACY_ENCODING_VERSION):
+        """
+        Get the active encoding version
+        
+        Args:
+            default (str): Version to assume if none was ever activated
+        
+        Returns:
+            str: Active encoding version
+        """
+        version = db.session.query(cls.version).filter(cls.is_active.is_(True)).scalar()
+        return version or default
+    
+    @classmethod
+    def activate(cls, version):
+        """
+        Make a version the active one and commit
+        
+        All rows are updated by one statement, so readers see either the old
+        or the new active version and never none or two.
+        
+        Args:
+            version (str): Encoding version to activate
+        """
+        if db.session.get(cls, version) is None:
+            db.session.add(cls(version=version))
+            db.session.flush()
+        
+        db.session.execute(
+            db.update(cls).values(
+                is_active=(cls.version == version),
+                activated_at=db.case((cls.version == version, datetime.utcnow()), else_=cls.activated_at)
+            )
+        )
+        db.session.commit()
+    
+    def __repr__(self):
+        """String representation of the EncodingVersion object"""
+        return f'<EncodingVersion {self.version} active={self.is_active}>'
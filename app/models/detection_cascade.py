@@ -0,0 +1,243 @@
+import os
+import threading
+import cv2
+import numpy as np
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+CASCADE_METHODS = ('haar', 'lbp', 'dnn')
+
+# Input size and BGR mean of the OpenCV SSD face detector (res10_300x300)
+DNN_INPUT_SIZE = 300
+DNN_MEAN = (104.0, 177.0, 123.0)
+
+class Region(NamedTuple):
+    """Frame region to run MTCNN on"""
+    x1: int
+    y1: int
+    x2: int
+    y2: int
+    scale: float  # Resize factor applied to the crop before detection
+
+class DetectionCascade:
+    """
+    Cheap first-stage face detector deciding where MTCNN has to look.
+
+    An OpenCV detector (Haar or LBP cascade, or the SSD face detector through
+    cv2.dnn) runs on a downscaled copy of the frame. Its detections are padded,
+    merged where they overlap and returned as regions; MTCNN then runs only on
+    those crops, each shrunk so the proposed face is about region_face_size
+    pixels wide. The full frame goes to MTCNN instead when the cheap stage is
+    unsure: too many proposals, regions covering most of the frame, DNN scores
+    in the uncertain band, or no proposals at all unless skip_empty is set.
+
+    Attributes:
+        method (str): Detector type, one of CASCADE_METHODS
+        padding (float): Padding added around each proposal, relative to its size
+        skip_empty (bool): Trust frames without proposals and skip MTCNN on them
+        max_regions (int): Maximum proposals before falling back to the full frame
+        max_area_fraction (float): Maximum frame fraction covered by regions
+        region_face_size (int): Proposed face width after shrinking its crop
+    """
+    def __init__(self, method: str = 'haar', model_path: Optional[str] = None,
+                 config_path: Optional[str] = None, padding: float = 0.5,
+                 skip_empty: bool = False, max_regions: int = 4,
+                 max_area_fraction: float = 0.5, region_face_size: int = 96,
+                 detect_size: int = 640, min_face_size: int = 40,
+                 min_neighbors: int = 3, confidence: float = 0.5,
+                 unsure_confidence: float = 0.2):
+        """
+        Initialize the cascade
+
+        Args:
+            method (str): 'haar', 'lbp' or 'dnn'
+            model_path (Optional[str]): Cascade XML file, or DNN weights (.caffemodel or .onnx);
+                                        defaults to OpenCV's frontal face Haar cascade
+            config_path (Optional[str]): DNN network description (deploy.prototxt)
+            padding (float): Padding added around each proposal, relative to its size
+            skip_empty (bool): Skip MTCNN on frames without proposals
+            max_regions (int): Maximum proposals before falling back to the full frame
+            max_area_fraction (float): Fall back to the full frame if regions cover more of it
+            region_face_size (int): Proposed face width after shrinking its crop
+            detect_size (int): Long side of the frame copy the cheap detector runs on
+            min_face_size (int): Smallest face proposed by cascade classifiers, in frame pixels
+            min_neighbors (int): Cascade classifier minNeighbors, lower favours recall
+            confidence (float): DNN score at which a detection becomes a proposal
+            unsure_confidence (float): DNN score from which a weaker detection makes
+                                       the cheap stage unsure
+
+        Raises:
+            ValueError: If the method is unknown or its model file is missing
+        """
+        if method not in CASCADE_METHODS:
+            raise ValueError(f"Unknown detection cascade '{method}', expected one of {CASCADE_METHODS}")
+
+        if model_path is None and method == 'haar':
+            model_path = os.path.join(cv2.data.haarcascades, 'haarcascade_frontalface_default.xml')
+        if not model_path or not os.path.exists(model_path):
+            raise ValueError(f"Model file for the '{method}' detection cascade not found: {model_path}")
+        if method == 'dnn' and config_path and not os.path.exists(config_path):
+            raise ValueError(f"DNN config file not found: {config_path}")
+
+        self.method = method
+        self.model_path = model_path
+        self.config_path = config_path
+        self.padding = padding
+        self.skip_empty = skip_empty
+        self.max_regions = max_regions
+        self.max_area_fraction = max_area_fraction
+        self.region_face_size = region_face_size
+        self.detect_size = detect_size
+        self.min_face_size = min_face_size
+        self.min_neighbors = min_neighbors
+        self.confidence = confidence
+        self.unsure_confidence = unsure_confidence
+
+        # OpenCV detectors are not safe to share between threads
+        self._local = threading.local()
+
+        self._lock = threading.Lock()
+        self._stats = {'frames': 0, 'cropped': 0, 'full_frame': 0, 'skipped_empty': 0, 'regions': 0}
+
+        # Load once up front so a broken model fails at startup
+        self._detector()
+
+    def _detector(self):
+        """Get this thread's OpenCV detector, loading it on first use"""
+        detector = getattr(self._local, 'detector', None)
+        if detector is None:
+            if self.method == 'dnn':
+                detector = cv2.dnn.readNet(self.model_path, self.config_path or '')
+            else:
+                detector = cv2.CascadeClassifier(self.model_path)
+                if detector.empty():
+                    raise ValueError(f"Could not load cascade classifier: {self.model_path}")
+            self._local.detector = detector
+        return detector
+
+    def propose(self, image: np.ndarray) -> Tuple[List[List[float]], bool]:
+        """
+        Run the cheap detector on an image
+
+        Args:
+            image (numpy.ndarray): Input image in BGR format
+
+        Returns:
+            Tuple containing:
+            - List of proposed face boxes [x1, y1, x2, y2] in image coordinates
+            - Whether the detector is unsure about the image
+        """
+        height, width = image.shape[:2]
+        factor = min(1.0, self.detect_size / max(height, width))
+        small = image
+        if factor < 1.0:
+            small = cv2.resize(image, None, fx=factor, fy=factor, interpolation=cv2.INTER_AREA)
+
+        detector = self._detector()
+
+        if self.method == 'dnn':
+            blob = cv2.dnn.blobFromImage(small, 1.0, (DNN_INPUT_SIZE, DNN_INPUT_SIZE), DNN_MEAN)
+            detector.setInput(blob)
+            # Detections of shape (1, 1, N, 7): [image_id, label, score, x1, y1, x2, y2]
+            detections = detector.forward().reshape(-1, 7)
+            scores = detections[:, 2]
+            confident = detections[scores >= self.confidence]
+            unsure = bool(np.any((scores >= self.unsure_confidence) & (scores < self.confidence)))
+            boxes = (confident[:, 3:7] * [width, height, width, height]).tolist()
+            return boxes, unsure
+
+        gray = cv2.equalizeHist(cv2.cvtColor(small, cv2.COLOR_BGR2GRAY))
+        min_size = max(12, int(self.min_face_size * factor))
+        rects = detector.detectMultiScale(
+            gray,
+            scaleFactor=1.1,
+            minNeighbors=self.min_neighbors,
+            minSize=(min_size, min_size)
+        )
+        boxes = [[x / factor, y / factor, (x + w) / factor, (y + h) / factor] for x, y, w, h in rects]
+        return boxes, False
+
+    def plan(self, image: np.ndarray) -> Optional[List[Region]]:
+        """
+        Decide where MTCNN should look in an image
+
+        Args:
+            image (numpy.ndarray): Input image in BGR format
+
+        Returns:
+            Optional[List[Region]]: Regions to run MTCNN on (empty if the frame has
+                                    no faces), or None to run it on the full frame
+        """
+        boxes, unsure = self.propose(image)
+        height, width = image.shape[:2]
+
+        regions = None
+        if not unsure and len(boxes) <= self.max_regions and (boxes or self.skip_empty):
+            regions = self._merge_regions(boxes, width, height)
+            area = sum((r.x2 - r.x1) * (r.y2 - r.y1) for r in regions)
+            if area > self.max_area_fraction * width * height:
+                regions = None
+
+        with self._lock:
+            self._stats['frames'] += 1
+            if regions is None:
+                self._stats['full_frame'] += 1
+            elif not regions:
+                self._stats['skipped_empty'] += 1
+            else:
+                self._stats['cropped'] += 1
+                self._stats['regions'] += len(regions)
+
+        return regions
+
+    def _merge_regions(self, boxes: List[List[float]], width: int, height: int) -> List[Region]:
+        """
+        Pad proposals, clip them to the frame and merge overlapping ones
+
+        Args:
+            boxes (List[List[float]]): Proposed face boxes [x1, y1, x2, y2]
+            width (int): Frame width
+            height (int): Frame height
+
+        Returns:
+            List[Region]: Disjoint regions, each scaled for its smallest proposed face
+        """
+        # [x1, y1, x2, y2, smallest face side]
+        padded = []
+        for x1, y1, x2, y2 in boxes:
+            side = max(x2 - x1, y2 - y1)
+            if side <= 0:
+                continue
+            pad = self.padding * side
+            padded.append([max(0, x1 - pad), max(0, y1 - pad), min(width, x2 + pad), min(height, y2 + pad), side])
+
+        merged = True
+        while merged:
+            merged = False
+            for i in range(len(padded)):
+                for j in range(i + 1, len(padded)):
+                    a, b = padded[i], padded[j]
+                    if a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]:
+                        padded[i] = [min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3]), min(a[4], b[4])]
+                        del padded[j]
+                        merged = True
+                        break
+                if merged:
+                    break
+
+        return [
+            Region(int(x1), int(y1), int(np.ceil(x2)), int(np.ceil(y2)), min(1.0, self.region_face_size / side))
+            for x1, y1, x2, y2, side in padded
+        ]
+
+    def get_stats(self) -> Dict:
+        """
+        Get cascade decision counts
+
+        Returns:
+            Dict: Frames seen, frames searched by crops, on the full frame and
+                  skipped as empty, and the total number of crops
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        stats['method'] = self.method
+        return stats
@@ -0,0 +1,156 @@
+import os
+import re
+import hashlib
+import tempfile
+import cv2
+import numpy as np
+from typing import Optional
+
+class DumpStorage:
+    """
+    Content-addressed storage for face dump images.
+
+    Images are encoded once, named after the hash of their encoded bytes and
+    placed in sharded subdirectories (e.g. ``ab/cd/abcd...webp``) so no single
+    directory grows to millions of entries. Identical crops share one file.
+    Enrollment images are kept the same way, stored as uploaded.
+
+    Attributes:
+        base_dir (str): Root directory for dump images
+        image_format (str): Image codec, one of FORMATS
+        quality (int): Encoder quality (0-100)
+        max_size (Optional[int]): Maximum crop side length in pixels, or None
+        shard_depth (int): Number of two-character shard directory levels
+    """
+    # Codec name -> (file extension, OpenCV quality flag)
+    FORMATS = {
+        'jpg': ('.jpg', cv2.IMWRITE_JPEG_QUALITY),
+        'jpeg': ('.jpg', cv2.IMWRITE_JPEG_QUALITY),
+        'webp': ('.webp', cv2.IMWRITE_WEBP_QUALITY),
+    }
+
+    # Digest length in bytes (hex names are twice as long)
+    DIGEST_SIZE = 16
+
+    _DIGEST_PATTERN = re.compile(r'^[0-9a-f]{%d}$' % (DIGEST_SIZE * 2))
+
+    def __init__(self, base_dir: str, image_format: str = 'webp', quality: int = 80,
+                 max_size: Optional[int] = None, shard_depth: int = 2):
+        """
+        Initialize the dump storage
+
+        Args:
+            base_dir (str): Root directory for dump images
+            image_format (str): Image codec ('jpg' or 'webp')
+            quality (int): Encoder quality (0-100)
+            max_size (Optional[int]): Downscale crops larger than this, None to keep size
+            shard_depth (int): Number of two-character shard directory levels
+        """
+        image_format = image_format.lower()
+        if image_format not in self.FORMATS:
+            raise ValueError(f"Unsupported dump image format: {image_format}")
+
+        self.base_dir = base_dir
+        self.image_format = image_format
+        self.quality = int(quality)
+        self.max_size = max_size or None
+        self.shard_depth = shard_depth
+
+        os.makedirs(base_dir, exist_ok=True)
+
+    def encode(self, image: np.ndarray) -> bytes:
+        """
+        Resize and encode an image with the configured codec
+
+        Args:
+            image (numpy.ndarray): Image in BGR format
+
+        Returns:
+            bytes: Encoded image
+        """
+        if self.max_size:
+            height, width = image.shape[:2]
+            scale = self.max_size / max(height, width)
+            if scale < 1:
+                size = (max(1, round(width * scale)), max(1, round(height * scale)))
+                image = cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+
+        extension, quality_flag = self.FORMATS[self.image_format]
+        ok, buffer = cv2.imencode(extension, image, [quality_flag, self.quality])
+        if not ok:
+            raise ValueError("Failed to encode dump image")
+        return buffer.tobytes()
+
+    def save(self, image: np.ndarray) -> str:
+        """
+        Store an image under its content hash
+
+        Args:
+            image (numpy.ndarray): Image in BGR format
+
+        Returns:
+            str: Filesystem path of the stored image
+        """
+        return self.store(self.encode(image), self.FORMATS[self.image_format][0])
+
+    def store(self, data: bytes, extension: str) -> str:
+        """
+        Store already encoded bytes under their content hash, without re-encoding
+
+        Args:
+            data (bytes): Encoded file contents
+            extension (str): File extension including the dot
+
+        Returns:
+            str: Filesystem path of the stored file
+        """
+        digest = hashlib.blake2b(data, digest_size=self.DIGEST_SIZE).hexdigest()
+
+        shards = [digest[i * 2:i * 2 + 2] for i in range(self.shard_depth)]
+        directory = os.path.join(self.base_dir, *shards)
+        path = os.path.join(directory, digest + extension)
+
+        # Identical content is already stored under the same name
+        if os.path.exists(path):
+            return path
+
+        os.makedirs(directory, exist_ok=True)
+
+        # Write to a temporary file first so readers never see partial images
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        return path
+
+    def relative_path(self, path: str) -> str:
+        """
+        Get a stored image path relative to the storage root
+
+        Args:
+            path (str): Filesystem path of a stored image
+
+        Returns:
+            str: Path relative to base_dir using forward slashes
+        """
+        return os.path.relpath(path, self.base_dir).replace(os.sep, '/')
+
+    @classmethod
+    def digest_from_path(cls, path: str) -> Optional[str]:
+        """
+        Extract the content hash from a stored image path
+
+        Args:
+            path (str): Path or filename of a stored image
+
+        Returns:
+            Optional[str]: Content hash, or None for non content-addressed files
+        """
+        stem = os.path.splitext(os.path.basename(path))[0]
+        return stem if cls._DIGEST_PATTERN.match(stem) else None
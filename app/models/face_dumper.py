@@ -1,12 +1,16 @@
-import os
 import json
-import cv2
+import threading
 import numpy as np
+from collections import OrderedDict, deque
 from datetime import datetime
-from typing import List, Tuple, Optional
-from .face_recognition import FaceRecognitionSystem
-from .emotion_detection import EmotionDetector
-from .database import db, User, FaceDump
+from typing import TYPE_CHECKING, Dict, List, Optional
+from .database import db, FaceDump
+from .dump_storage import DumpStorage
+from .gallery import GalleryCache, GalleryMatch
+
+if TYPE_CHECKING:
+    from .emotion_detection import EmotionDetector
+    from .face_recognition import FaceRecognitionSystem
 
 class FaceDumper:
     """
@@ -17,52 +21,111 @@ class FaceDumper:
     - Emotion detection
     - Data storage
     - Face matching
+    - Near-duplicate suppression
     
     Attributes:
         face_recognition (FaceRecognitionSystem): Face recognition system
         emotion_detector (EmotionDetector): Emotion detection system
         dump_interval (int): Interval between dumps in seconds
-        last_dump_time (float): Timestamp of last dump
+        last_dump_times (Dict[Optional[str], float]): Timestamp of last dump per frame source
         dump_dir (str): Directory to store face images
+        storage (DumpStorage): Content-addressed image storage under dump_dir
+        gallery (GalleryCache): Stored face encodings used for matching
+        dedup_similarity (float): Cosine similarity above which a dump is a duplicate
+        dedup_window (float): How long a written dump suppresses duplicates, in seconds
+        dedup_history (int): Number of recent embeddings kept per user
+        dumps_written (int): Number of dumps written
+        dumps_suppressed (int): Number of dumps skipped as near-duplicates
     """
-    def __init__(self, dump_interval: int = 5, dump_dir: str = 'uploads/dumps'):
+    def __init__(self, dump_interval: int = 5, dump_dir: str = 'uploads/dumps',
+                 image_format: str = 'webp', image_quality: int = 80,
+                 max_crop_size: Optional[int] = None,
+                 dedup_similarity: float = 0.95, dedup_window: float = 60,
+                 dedup_history: int = 8,
+                 face_recognition: Optional['FaceRecognitionSystem'] = None,
+                 gallery: Optional[GalleryCache] = None,
+                 emotion_detector: Optional['EmotionDetector'] = None):
         """
         Initialize the face dumper
         
         Args:
             dump_interval (int): Interval between dumps in seconds
             dump_dir (str): Directory to store face images
+            image_format (str): Codec for stored face images ('jpg' or 'webp')
+            image_quality (int): Encoder quality for stored face images (0-100)
+            max_crop_size (Optional[int]): Downscale face crops larger than this
+            dedup_similarity (float): Cosine similarity above which a dump is a duplicate
+            dedup_window (float): How long a written dump suppresses duplicates, in seconds,
+                                  0 disables suppression
+            dedup_history (int): Number of recent embeddings kept per user
+            face_recognition (Optional[FaceRecognitionSystem]): Shared face recognition
+                                                                system, a new one if None
+            gallery (Optional[GalleryCache]): Shared gallery of stored encodings, a new one if None
+            emotion_detector (Optional[EmotionDetector]): Emotion detection system, a new one if None
         """
-        self.face_recognition = FaceRecognitionSystem()
-        self.emotion_detector = EmotionDetector()
+        # Models are imported lazily so stub models work without PyTorch or FER installed
+        if face_recognition is None:
+            from .face_recognition import FaceRecognitionSystem
+            face_recognition = FaceRecognitionSystem()
+        if emotion_detector is None:
+            from .emotion_detection import EmotionDetector
+            emotion_detector = EmotionDetector()
+        
+        self.face_recognition = face_recognition
+        self.gallery = gallery or GalleryCache(model_version=face_recognition.encoding_version)
+        self.emotion_detector = emotion_detector
         self.dump_interval = dump_interval
-        self.last_dump_time = 0
+        self.last_dump_times: Dict[Optional[str], float] = {}
         self.dump_dir = dump_dir
         
-        # Create dump directory if it doesn't exist
-        os.makedirs(dump_dir, exist_ok=True)
+        # Creates the dump directory if it doesn't exist
+        self.storage = DumpStorage(
+            dump_dir,
+            image_format=image_format,
+            quality=image_quality,
+            max_size=max_crop_size
+        )
+        
+        # Recently dumped (timestamp, normalized embedding, emotion) per user,
+        # users ordered by their last dump so expired ones are swept from the front
+        self.dedup_similarity = dedup_similarity
+        self.dedup_window = dedup_window
+        self.dedup_history = dedup_history
+        self._recent_dumps: 'OrderedDict[int, deque]' = OrderedDict()
+        self.dumps_written = 0
+        self.dumps_suppressed = 0
+        
+        # Guards dump times, recent dumps and counters across inference and I/O threads
+        self._lock = threading.Lock()
+        self._emotion_lock = threading.Lock()
     
-    def should_dump(self) -> bool:
+    def should_dump(self, source: Optional[str] = None) -> bool:
         """
         Check if it's time to dump face data
         
+        Args:
+            source (Optional[str]): Frame source (e.g. camera name), None for the web client
+        
         Returns:
             bool: True if it's time to dump, False otherwise
         """
         current_time = datetime.now().timestamp()
-        return current_time - self.last_dump_time >= self.dump_interval
+        with self._lock:
+            return current_time - self.last_dump_times.get(source, 0) >= self.dump_interval
     
-    def process_frame(self, frame: np.ndarray) -> List[dict]:
+    def process_frame(self, frame: np.ndarray, source: Optional[str] = None) -> List[dict]:
         """
         Process a video frame and dump face data if needed
         
         Args:
             frame (numpy.ndarray): Video frame in BGR format
+            source (Optional[str]): Frame source (e.g. camera name); each source
+                                    has its own dump interval
         
         Returns:
             List[dict]: List of processed face data
         """
-        if not self.should_dump():
+        if not self.should_dump(source):
             return []
         
         # Detect faces
@@ -70,82 +133,226 @@ class FaceDumper:
         if not faces:
             return []
         
-        results = []
-        for face, box in zip(faces, boxes):
-            # Get face embedding
-            embedding = self.face_recognition.get_face_embedding(face)
-            if embedding is None:
-                continue
-            
-            # Find matching user
-            user, similarity = self._find_matching_user(embedding)
-            if user is None:
+        # Get face embeddings in one batch
+        embeddings = self.face_recognition.get_face_embeddings(faces)
+        
+        # Find matching users
+        gallery = self.gallery.get()
+        matches = [None if embedding is None else gallery.match(embedding) for embedding in embeddings]
+        
+        return self.write_dumps(self.analyze_faces(faces, boxes, embeddings, matches, source))
+    
+    def analyze_faces(self, faces: List[np.ndarray], boxes: List[List[int]],
+                      embeddings: List[Optional[np.ndarray]], matches: List[Optional[GalleryMatch]],
+                      source: Optional[str] = None) -> List[dict]:
+        """
+        Detect the emotions of a frame's recognized faces if the frame is due for dumping
+        
+        This is the inference half of dumping: it runs emotion detection but
+        touches neither the database nor the dump storage, so it can run on the
+        inference pool. The results are written with write_dumps.
+        
+        Args:
+            faces (List[numpy.ndarray]): Detected face images in BGR format
+            boxes (List[List[int]]): Bounding box of each face
+            embeddings (List[Optional[numpy.ndarray]]): Embedding of each face, None if it failed
+            matches (List[Optional[GalleryMatch]]): Gallery match of each face, None if not embedded
+            source (Optional[str]): Frame source (e.g. camera name); each source
+                                    has its own dump interval
+        
+        Returns:
+            List[dict]: Dump candidates with face, box, embedding, match and emotion,
+                        empty if the source's dump interval has not passed
+        """
+        # Claim the interval up front so concurrent frames of a source dump once
+        now = datetime.now().timestamp()
+        with self._lock:
+            if now - self.last_dump_times.get(source, 0) < self.dump_interval:
+                return []
+            self.last_dump_times[source] = now
+        
+        candidates = []
+        for face, box, embedding, match in zip(faces, boxes, embeddings, matches):
+            if embedding is None or match is None or match.user_id is None:
                 continue
             
-            # Detect emotion
-            emotions = self.emotion_detector.detect_emotion(face)
+            # Detect emotion, the FER model is not safe for concurrent calls
+            with self._emotion_lock:
+                emotions = self.emotion_detector.detect_emotion(face)
             if emotions is None:
                 continue
             
-            # Get dominant emotion
-            dominant_emotion = self.emotion_detector.get_dominant_emotion(emotions)
-            
-            # Convert box coordinates to Python integers
-            box = [int(x) for x in box]
+            candidates.append({
+                'face': face,
+                # Convert box coordinates to Python integers
+                'box': [int(x) for x in box],
+                'embedding': embedding,
+                'match': match,
+                'emotion': self.emotion_detector.get_dominant_emotion(emotions)
+            })
+        
+        return candidates
+    
+    def write_dumps(self, candidates: List[dict], scale: float = 1.0) -> List[dict]:
+        """
+        Store dump candidates from analyze_faces, skipping near-duplicates
+        
+        Writes the face images and commits a FaceDump per face, so it needs an
+        app context and belongs on an I/O thread rather than the inference pool.
+        
+        Args:
+            candidates (List[dict]): Dump candidates returned by analyze_faces
+            scale (float): Factor mapping frame coordinates back to the uploaded
+                           image, for frames decoded at reduced resolution
+        
+        Returns:
+            List[dict]: List of processed face data, boxes in uploaded image coordinates
+        """
+        results = []
+        for candidate in candidates:
+            match = candidate['match']
+            # Stored boxes refer to the uploaded image, not the decoded frame
+            box = [int(round(x * scale)) for x in candidate['box']] if scale != 1.0 else candidate['box']
+            embedding = candidate['embedding']
+            dominant_emotion = candidate['emotion']
             
             # Convert similarity score to Python float
-            similarity = float(similarity)
+            similarity = float(match.score)
             
-            # Save face image
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
-            filename = f"{user.id}_{timestamp}.jpg"
-            filepath = os.path.join(self.dump_dir, filename)
-            cv2.imwrite(filepath, face)
+            # Skip the write if this user was just dumped looking the same,
+            # otherwise reserve the dump so concurrent writers see it
+            entry = self._reserve_dump(match.user_id, embedding, dominant_emotion)
+            if entry is None:
+                results.append({
+                    'user_id': match.user_id,
+                    'name': match.name,
+                    'box': box,
+                    'emotion': dominant_emotion,
+                    'similarity': similarity,
+                    'image_path': None,
+                    'suppressed': True
+                })
+                continue
             
-            # Create face dump
-            face_dump = FaceDump(
-                user_id=user.id,
-                face_image_path=filepath,
-                bounding_box=json.dumps(box),
-                emotion=dominant_emotion,
-                similarity_score=similarity
-            )
+ 
+            try:
+                # Save face image
+                filepath = self.storage.save(candidate['face'])
+                
+                # Create face dump
+                face_dump = FaceDump(
+                    user_id=match.user_id,
+                    face_image_path=filepath,
+                    bounding_box=json.dumps(box),
+                    emotion=dominant_emotion,
+                    similarity_score=similarity,
+                    model_version=self.face_recognition.encoding_version
+                )
+                face_dump.set_embedding(embedding)
+                
+                db.session.add(face_dump)
+                db.session.commit()
+            except Exception:
+                self._release_dump(match.user_id, entry)
+                raise
             
-            db.session.add(face_dump)
-            db.session.commit()
+            with self._lock:
+                self.dumps_written += 1
             
             results.append({
-                'user_id': user.id,
-                'name': user.name,
+                'user_id': match.user_id,
+                'name': match.name,
                 'box': box,
                 'emotion': dominant_emotion,
                 'similarity': similarity,
-                'image_path': filepath
+                'image_path': filepath,
+                'suppressed': False
             })
         
-        self.last_dump_time = datetime.now().timestamp()
         return results
     
-    def _find_matching_user(self, embedding: np.ndarray) -> Tuple[Optional[User], float]:
+    def get_stats(self) -> dict:
         """
-        Find the user that matches the face embedding
+        Get dump write and suppression counters
+        
+        Returns:
+            dict: Number of dumps written and suppressed
+        """
+        with self._lock:
+            return {
+                'dumps_written': self.dumps_written,
+                'dumps_suppressed': self.dumps_suppressed
+            }
+    
+    def _reserve_dump(self, user_id: int, embedding: np.ndarray, emotion: str) -> Optional[tuple]:
+        """
+        Check a face against the user's recent dumps and reserve a dump if it is new
+        
+        The check and the reservation happen under one lock acquisition, so two
+        threads dumping the same face (e.g. stream ingest and the web route)
+        cannot both write it. A duplicate is counted in dumps_suppressed.
         
         Args:
+            user_id (int): ID of the matched user
             embedding (numpy.ndarray): Face embedding vector
+            emotion (str): Dominant emotion of the face
         
         Returns:
-            Tuple[Optional[User], float]: Matching user and similarity score
+            Optional[tuple]: The reserved ring buffer entry, to be released if the
+                             write fails, or None if an embedding dumped within the
+                             window is more similar than dedup_similarity and has the
+                             same emotion
         """
-        best_match = None
-        best_score = 0.0
+        now = datetime.now().timestamp()
+        entry = (now, embedding / np.linalg.norm(embedding), emotion)
+        if self.dedup_window <= 0:
+            return entry
         
-        for user in User.query.all():
-            for stored_encoding in user.face_encodings:
-                stored_embedding = stored_encoding.get_encoding()
-                score = float(self.face_recognition.compare_faces(embedding, stored_embedding))  # Convert to Python float
-                
-                if score > best_score:
-                    best_score = score
-                    best_match = user
+        with self._lock:
+            self._sweep_expired(now)
+            
+            recent = self._recent_dumps.get(user_id)
+            if recent is None:
+                recent = self._recent_dumps[user_id] = deque(maxlen=self.dedup_history)
+            
+            for timestamp, recent_embedding, recent_emotion in recent:
+                if now - timestamp > self.dedup_window or recent_emotion != emotion:
+                    continue
+                if float(np.dot(entry[1], recent_embedding)) >= self.dedup_similarity:
+                    self.dumps_suppressed += 1
+                    return None
+            
+            recent.append(entry)
+            self._recent_dumps.move_to_end(user_id)
+        
+        return entry
+    
+    def _release_dump(self, user_id: int, entry: tuple):
+        """
+        Drop a reservation whose dump could not be written
+        
+        Args:
+            user_id (int): ID of the matched user
+            entry (tuple): Entry returned by _reserve_dump
+        """
+        with self._lock:
+            recent = self._recent_dumps.get(user_id)
+            if recent is not None:
+                # By identity, entries hold arrays that do not compare with ==
+                self._recent_dumps[user_id] = deque((e for e in recent if e is not entry), maxlen=self.dedup_history)
+    
+    def _sweep_expired(self, now: float):
+        """
+        Forget users whose latest dump is older than the dedup window
         
-        return best_match, best_score 
\ No newline at end of file
+        Users are ordered by their latest dump, so only expired users at the
+        front are visited. Must be called with the lock held.
+        
+        Args:
+            now (float): Current timestamp
+        """
+        while self._recent_dumps:
+            user_id, recent = next(iter(self._recent_dumps.items()))
+            if recent and now - recent[-1][0] <= self.dedup_window:
+                break
+            del self._recent_dumps[user_id]
@@ -4,6 +4,28 @@ import cv2
 import numpy as np
 from PIL import Image
 from typing import List, Tuple, Optional
+from .detection_cascade import DetectionCascade
+from .inference_backend import build_facenet_backend, configure_threads, trace_mtcnn
+from .micro_batcher import MicroBatcher
+
+# Bump whenever preprocess_face or detection cropping changes the embeddings
+PREPROCESSING_VERSION = 1
+
+def encoding_version(backend: str = 'eager') -> str:
+    """
+    Get the version tag of embeddings produced with a backend
+    
+    Embeddings are compatible across backends within the tolerance checked by
+    compare_backends, except for int8 quantization.
+    
+    Args:
+        backend (str): FaceNet inference backend
+    
+    Returns:
+        str: Encoding version, e.g. 'vggface2-fp32-p1'
+    """
+    precision = 'int8' if backend == 'quantized' else 'fp32'
+    return f'vggface2-{precision}-p{PREPROCESSING_VERSION}'
 
 class FaceRecognitionSystem:
     """
@@ -17,16 +39,45 @@ class FaceRecognitionSystem:
     Attributes:
         device (str): Device to run models on ('cuda' or 'cpu')
         mtcnn (MTCNN): Face detection model
-        facenet (InceptionResnetV1): Face recognition model
+        facenet (InceptionResnetV1): Face recognition model (eager reference)
+        backend (str): FaceNet inference backend name
+        encoding_version (str): Version tag of the embeddings this system produces
+        embedder (Callable): Backend mapping face tensors to embeddings
+        batcher (Optional[MicroBatcher]): Scheduler batching FaceNet calls across threads
+        cascade (Optional[DetectionCascade]): Cheap detector choosing where MTCNN looks
     """
-    def __init__(self, device='cuda' if torch.cuda.is_available() else 'cpu'):
+    def __init__(self, device='cuda' if torch.cuda.is_available() else 'cpu',
+                 backend: str = 'eager', intra_op_threads: Optional[int] = None,
+                 inter_op_threads: Optional[int] = None, onnx_path: Optional[str] = None,
+                 batch_window_ms: Optional[float] = None, max_batch_size: int = 16,
+                 detection_cascade: Optional[str] = None, cascade_model_path: Optional[str] = None,
+                 cascade_config_path: Optional[str] = None, cascade_padding: float = 0.5,
+                 cascade_skip_empty: bool = False):
         """
         Initialize the face recognition system
         
         Args:
             device (str): Device to run models on ('cuda' or 'cpu')
+            backend (str): FaceNet inference backend ('eager', 'torchscript',
+                           'quantized' or 'onnx'); non-eager backends also trace MTCNN
+            intra_op_threads (Optional[int]): CPU threads used inside a single operator
+            inter_op_threads (Optional[int]): CPU threads used to run independent operators
+            onnx_path (Optional[str]): Path of the ONNX model for the 'onnx' backend
+            batch_window_ms (Optional[float]): Collect concurrent FaceNet calls for up to
+                                               this long into one batch, None disables batching
+            max_batch_size (int): Maximum number of faces per FaceNet batch
+            detection_cascade (Optional[str]): Cheap first-stage detector ('haar', 'lbp'
+                                               or 'dnn') run before MTCNN, None disables it
+            cascade_model_path (Optional[str]): Cascade XML or DNN weights for the first stage
+            cascade_config_path (Optional[str]): DNN network description for the first stage
+            cascade_padding (float): Padding around first-stage proposals, relative to their size
+            cascade_skip_empty (bool): Skip MTCNN on frames without first-stage proposals
         """
         self.device = device
+        self.backend = backend
+        self.encoding_version = encoding_version(backend)
+        
+        configure_threads(intra_op_threads, inter_op_threads)
         
         # Initialize the MTCNN for face detection
         self.mtcnn = MTCNN(
@@ -41,13 +92,48 @@ class FaceRecognitionSystem:
             pretrained='vggface2',
             device=device
         ).eval()
+        
+        # Build the selected inference backend from the eager model
+        self.embedder = build_facenet_backend(
+            self.facenet,
+            backend,
+            device=device,
+            onnx_path=onnx_path,
+            intra_op_threads=intra_op_threads,
+            inter_op_threads=inter_op_threads
+        )
+        if backend != 'eager':
+            trace_mtcnn(self.mtcnn)
+        
+        # Optionally batch FaceNet calls from concurrent callers
+        self.batcher = None
+        if batch_window_ms:
+            self.batcher = MicroBatcher(
+                self._embed_batch,
+                max_batch_size=max_batch_size,
+                max_wait_ms=batch_window_ms,
+                name='facenet-batcher'
+            )
+        
+        # Optionally restrict MTCNN to regions proposed by a cheap detector
+        self.cascade = None
+        if detection_cascade:
+            self.cascade = DetectionCascade(
+                detection_cascade,
+                model_path=cascade_model_path,
+                config_path=cascade_config_path,
+                padding=cascade_padding,
+                skip_empty=cascade_skip_empty
+            )
     
-    def detect_faces(self, image: np.ndarray) -> Tuple[List[np.ndarray], List[List[int]]]:
+    def detect_faces(self, image: np.ndarray, use_cascade: bool = True) -> Tuple[List[np.ndarray], List[List[int]]]:
         """
         Detect faces in an image and return their bounding boxes
         
         Args:
             image (numpy.ndarray): Input image in BGR format with shape (H, W, C)
+            use_cascade (bool): Use the detection cascade if configured; enrollment
+                                passes False so a missed proposal never loses a face
         
         Returns:
             Tuple containing:
@@ -57,11 +143,11 @@ class FaceRecognitionSystem:
         # Convert BGR to RGB
         image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
         
-        # Convert to PIL Image
-        pil_image = Image.fromarray(image_rgb)
-        
         # Detect faces
-        boxes, probs = self.mtcnn.detect(pil_image)
+        if self.cascade is not None and use_cascade:
+            boxes = self._detect_in_regions(image, image_rgb)
+        else:
+            boxes = self._mtcnn_boxes(image_rgb)
         
         if boxes is None:
             return [], []
@@ -78,6 +164,70 @@ class FaceRecognitionSystem:
         
         return faces, valid_boxes
     
+    def _mtcnn_boxes(self, image_rgb: np.ndarray) -> Optional[np.ndarray]:
+        """
+        Run MTCNN on an image
+        
+        Args:
+            image_rgb (numpy.ndarray): Image in RGB format
+        
+        Returns:
+            Optional[numpy.ndarray]: Boxes of shape (N, 4), or None if no face was found
+        """
+        boxes, probs = self.mtcnn.detect(Image.fromarray(image_rgb))
+        return boxes
+    
+    def _detect_in_regions(self, image: np.ndarray, image_rgb: np.ndarray) -> Optional[np.ndarray]:
+        """
+        Run MTCNN only where the detection cascade proposes faces
+        
+        Args:
+            image (numpy.ndarray): Image in BGR format, for the cascade
+            image_rgb (numpy.ndarray): The same image in RGB format, for MTCNN
+        
+        Returns:
+            Optional[numpy.ndarray]: Boxes of shape (N, 4) in image coordinates,
+                                     or None if no face was found
+        """
+        regions = self.cascade.plan(image)
+        if regions is None:
+            return self._mtcnn_boxes(image_rgb)
+        
+        boxes = []
+        for region in regions:
+            crop = np.ascontiguousarray(image_rgb[region.y1:region.y2, region.x1:region.x2])
+            if region.scale < 1.0:
+                crop = cv2.resize(crop, None, fx=region.scale, fy=region.scale, interpolation=cv2.INTER_AREA)
+            found = self._mtcnn_boxes(crop)
+            if found is not None:
+                # Map crop coordinates back to the image
+                boxes.extend(found / region.scale + [region.x1, region.y1, region.x1, region.y1])
+        
+        return np.array(boxes) if boxes else None
+    
+    def preprocess_face(self, face_image: np.ndarray) -> torch.Tensor:
+        """
+        Convert a face image into a FaceNet input tensor
+        
+        Args:
+            face_image (numpy.ndarray): Face image in BGR format
+        
+        Returns:
+            torch.Tensor: Face tensor of shape (3, 160, 160) scaled to [0, 1]
+        """
+        # Convert BGR to RGB
+        face_rgb = cv2.cvtColor(face_image, cv2.COLOR_BGR2RGB)
+        
+        # Convert to PIL Image and resize
+        face_pil = Image.fromarray(face_rgb).resize((160, 160))
+        
+        # Convert to tensor
+        face_tensor = torch.from_numpy(np.array(face_pil)).float()
+        # Change from (H, W, C) to (C, H, W)
+        face_tensor = face_tensor.permute(2, 0, 1)
+        # Normalize
+        return face_tensor / 255.0
+    
     def get_face_embedding(self, face_image: np.ndarray) -> Optional[np.ndarray]:
         """
         Generate embedding for a face image using FaceNet
@@ -89,33 +239,55 @@ class FaceRecognitionSystem:
             Optional[numpy.ndarray]: Face embedding vector of shape (512,) or None if error
         """
         try:
-            # Convert BGR to RGB
-            face_rgb = cv2.cvtColor(face_image, cv2.COLOR_BGR2RGB)
-            
-            # Convert to PIL Image and resize
-            face_pil = Image.fromarray(face_rgb).resize((160, 160))
-            
-            # Convert to tensor
-            face_tensor = torch.from_numpy(np.array(face_pil)).float()
-            # Change from (H, W, C) to (C, H, W)
-            face_tensor = face_tensor.permute(2, 0, 1)
-            # Add batch dimension
-            face_tensor = face_tensor.unsqueeze(0)
-            # Normalize
-            face_tensor = face_tensor / 255.0
-            
-            # Move to device
-            face_tensor = face_tensor.to(self.device)
+            face_tensor = self.preprocess_face(face_image)
             
-            # Get embedding
-            with torch.no_grad():
-                embedding = self.facenet(face_tensor).squeeze().cpu().numpy()
+            # Share a forward pass with concurrent callers if batching is enabled
+            if self.batcher is not None:
+                return self.batcher(face_tensor)
             
-            return embedding
+            # Add batch dimension and get embedding
+            return self.embedder(face_tensor.unsqueeze(0))[0]
         except Exception as e:
             print(f"Error generating face embedding: {e}")
             return None
     
+    def get_face_embeddings(self, face_images: List[np.ndarray]) -> List[Optional[np.ndarray]]:
+        """
+        Generate embeddings for several face images
+        
+        Args:
+            face_images (List[numpy.ndarray]): Face images in BGR format
+        
+        Returns:
+            List[Optional[numpy.ndarray]]: Embedding of shape (512,) per face, None if error
+        """
+        if not face_images:
+            return []
+        
+        try:
+            face_tensors = [self.preprocess_face(face) for face in face_images]
+            
+            if self.batcher is not None:
+                futures = [self.batcher.submit(tensor) for tensor in face_tensors]
+                return [future.result() for future in futures]
+            
+            return list(self._embed_batch(face_tensors))
+        except Exception as e:
+            print(f"Error generating face embeddings: {e}")
+            return [None] * len(face_images)
+    
+    def _embed_batch(self, face_tensors: List[torch.Tensor]) -> np.ndarray:
+        """
+        Run one FaceNet forward pass over preprocessed faces
+        
+        Args:
+            face_tensors (List[torch.Tensor]): Face tensors of shape (3, 160, 160)
+        
+        Returns:
+            numpy.ndarray: Embeddings of shape (N, 512)
+        """
+        return self.embedder(torch.stack(face_tensors))
+    
     def compare_faces(self, embedding1: np.ndarray, embedding2: np.ndarray) -> float:
         """
         Compare two face embeddings and return similarity score using cosine similarity
@@ -0,0 +1,294 @@
+import time
+import threading
+import numpy as np
+from typing import Dict, List, NamedTuple, Optional
+from .database import db, User, FaceEncoding, EncodingVersion
+
+# FaceNet embedding size
+EMBEDDING_DIM = 512
+
+class EncodingVersionMismatch(Exception):
+    """Raised when this process embeds with another encoding version than the active one"""
+    def __init__(self, process_version: str, active_version: str):
+        super().__init__(
+            f"This server produces {process_version} encodings but {active_version} is active; "
+            f"redeploy it with the configuration of the active version"
+        )
+        self.process_version = process_version
+        self.active_version = active_version
+
+class GalleryMatch(NamedTuple):
+    """Best gallery match for a probe embedding"""
+    user_id: Optional[int]
+    name: Optional[str]
+    score: float
+
+class Gallery:
+    """
+    In-memory matrix of all stored face encodings.
+
+    Attributes:
+        encoding_ids (numpy.ndarray): FaceEncoding IDs of shape (N,)
+        user_ids (numpy.ndarray): User ID of each encoding, shape (N,)
+        embeddings (numpy.ndarray): L2-normalized encodings of shape (N, 512)
+        user_names (Dict[int, str]): User names by user ID
+        model_version (Optional[str]): Encoding version of all embeddings, None if unfiltered
+    """
+    def __init__(self, encoding_ids: np.ndarray, user_ids: np.ndarray,
+                 embeddings: np.ndarray, user_names: Dict[int, str],
+                 model_version: Optional[str] = None):
+        """
+        Initialize the gallery
+
+        Args:
+            encoding_ids (numpy.ndarray): FaceEncoding IDs of shape (N,)
+            user_ids (numpy.ndarray): User ID of each encoding, shape (N,)
+            embeddings (numpy.ndarray): L2-normalized encodings of shape (N, 512)
+            user_names (Dict[int, str]): User names by user ID
+            model_version (Optional[str]): Encoding version of all embeddings, None if unfiltered
+        """
+        self.encoding_ids = encoding_ids
+        self.user_ids = user_ids
+        self.embeddings = embeddings
+        self.user_names = user_names
+        self.model_version = model_version
+
+    def __len__(self):
+        """Number of encodings in the gallery"""
+        return len(self.encoding_ids)
+
+    def match(self, embedding: np.ndarray) -> GalleryMatch:
+        """
+        Find the gallery encoding most similar to a probe embedding
+
+        Args:
+            embedding (numpy.ndarray): Probe embedding of shape (512,)
+
+        Returns:
+            GalleryMatch: Best matching user and cosine similarity, or no user
+                          and a score of 0.0 if nothing scores above zero
+        """
+        return self.match_many(embedding[np.newaxis])[0]
+
+    def match_many(self, embeddings: np.ndarray, block_size: int = 16384) -> List[GalleryMatch]:
+        """
+        Find the best gallery match for each of several probe embeddings
+
+        The gallery is scored in blocks of `block_size` encodings so the score
+        matrix never exceeds (M, block_size).
+
+        Args:
+            embeddings (numpy.ndarray): Probe embeddings of shape (M, 512)
+            block_size (int): Gallery encodings scored per matrix product
+
+        Returns:
+            List[GalleryMatch]: Best match per probe
+        """
+        best_indices, best_scores = self.best_matches(embeddings, block_size)
+
+        matches = []
+        for index, score in zip(best_indices, best_scores):
+            score = float(score)
+            if index < 0 or score <= 0.0:
+                matches.append(GalleryMatch(None, None, 0.0))
+                continue
+            user_id = int(self.user_ids[index])
+            matches.append(GalleryMatch(user_id, self.user_names.get(user_id), score))
+        return matches
+
+    def best_matches(self, embeddings: np.ndarray, block_size: int = 16384):
+        """
+        Score probes against the gallery in blocks and keep the best encoding per probe
+
+        Args:
+            embeddings (numpy.ndarray): Probe embeddings of shape (M, 512)
+            block_size (int): Gallery encodings scored per matrix product
+
+        Returns:
+            Tuple[numpy.ndarray, numpy.ndarray]: Best gallery row per probe (-1 if the
+                                                 gallery is empty) and its cosine similarity
+        """
+        probes = np.asarray(embeddings, dtype=np.float32)
+        probes = probes / np.linalg.norm(probes, axis=1, keepdims=True)
+
+        best_indices = np.full(len(probes), -1, dtype=np.int64)
+        best_scores = np.full(len(probes), -np.inf, dtype=np.float32)
+        rows = np.arange(len(probes))
+
+        for start in range(0, len(self), block_size):
+            scores = probes @ self.embeddings[start:start + block_size].T
+            block_best = scores.argmax(axis=1)
+            block_scores = scores[rows, block_best]
+            improved = block_scores > best_scores
+            best_indices[improved] = block_best[improved] + start
+            best_scores[improved] = block_scores[improved]
+
+        return best_indices, best_scores
+
+def load_gallery(chunk_size: int = 10000, model_version: Optional[str] = None) -> Gallery:
+    """
+    Load face encodings into a preallocated matrix without building ORM objects
+
+    Only (id, user_id, encoding_vector) are selected and rows are streamed in
+    chunks (a server-side cursor on PostgreSQL), so memory stays flat apart
+    from the result matrix. User names are loaded in one query. Embeddings of
+    different versions are not comparable, so matching code loads one version.
+
+    Args:
+        chunk_size (int): Rows fetched per round trip
+        model_version (Optional[str]): Only load encodings of this version
+
+    Returns:
+        Gallery: Encodings with L2-normalized embeddings
+    """
+    count_query = db.session.query(db.func.count(FaceEncoding.id))
+    if model_version is not None:
+        count_query = count_query.filter(FaceEncoding.model_version == model_version)
+    capacity = count_query.scalar() or 0
+    encoding_ids = np.empty(capacity, dtype=np.int64)
+    user_ids = np.empty(capacity, dtype=np.int64)
+    embeddings = np.empty((capacity, EMBEDDING_DIM), dtype=np.float32)
+
+    statement = db.select(
+        FaceEncoding.id,
+        FaceEncoding.user_id,
+        FaceEncoding.encoding_vector
+    ).order_by(FaceEncoding.id).execution_options(yield_per=chunk_size)
+    if model_version is not None:
+        statement = statement.filter(FaceEncoding.model_version == model_version)
+
+    count = 0
+    for rows in db.session.execute(statement).partitions():
+        # Rows may have been added since the count
+        if count + len(rows) > capacity:
+            capacity = max(capacity * 2, count + len(rows))
+            encoding_ids = np.resize(encoding_ids, capacity)
+            user_ids = np.resize(user_ids, capacity)
+            embeddings = np.resize(embeddings, (capacity, EMBEDDING_DIM))
+
+        for encoding_id, user_id, vector in rows:
+            if len(vector) != EMBEDDING_DIM * 4:
+                continue
+            encoding_ids[count] = encoding_id
+            user_ids[count] = user_id
+            embeddings[count] = np.frombuffer(vector, dtype=np.float32)
+            count += 1
+
+    encoding_ids = encoding_ids[:count]
+    user_ids = user_ids[:count]
+    embeddings = embeddings[:count]
+
+    # Normalize in place so matching is a plain dot product
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    np.divide(embeddings, norms, out=embeddings, where=norms > 0)
+
+    user_names = dict(db.session.query(User.id, User.name).all())
+
+    return Gallery(encoding_ids, user_ids, embeddings, user_names, model_version)
+
+class GalleryCache:
+    """
+    Shared gallery that is reloaded only when the stored encodings change.
+
+    Changes are detected from the active encoding version, the encoding count,
+    the highest encoding ID and the user count, checked at most every
+    `check_interval` seconds.
+
+    Only the active version is served. Probes are embedded with this process's
+    model, so if that produces another version (the active one was switched
+    by a re-encoding run, or this process was deployed with a new model before
+    the switch), get() raises EncodingVersionMismatch instead of matching
+    against incomparable embeddings.
+
+    Attributes:
+        check_interval (float): Minimum seconds between change checks
+        chunk_size (int): Rows fetched per round trip when loading
+        model_version (Optional[str]): Encoding version of the probe embeddings; None
+                                       loads all encodings regardless of the active version
+    """
+    def __init__(self, check_interval: float = 2.0, chunk_size: int = 10000,
+                 model_version: Optional[str] = None):
+        """
+        Initialize the cache
+
+        Args:
+            check_interval (float): Minimum seconds between change checks
+            chunk_size (int): Rows fetched per round trip when loading
+            model_version (Optional[str]): Encoding version this process embeds with
+        """
+        self.check_interval = check_interval
+        self.chunk_size = chunk_size
+        self.model_version = model_version
+        self._gallery = None
+        self._signature = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self) -> Gallery:
+        """
+        Get the current gallery, reloading it if the stored encodings changed
+
+        Needs an app context for database access.
+
+        Returns:
+            Gallery: Current gallery
+
+        Raises:
+            EncodingVersionMismatch: If the active version is not this process's version
+        """
+        now = time.monotonic()
+        if self._gallery is not None and now - self._checked_at < self.check_interval:
+            return self._gallery
+
+        with self._lock:
+            if self._gallery is not None and now - self._checked_at < self.check_interval:
+                return self._gallery
+
+            signature = self._current_signature()
+            active_version = signature[0]
+            if self.model_version is not None and active_version != self.model_version:
+                # Stop serving the old gallery at once, and check again on the next call
+                self._gallery = None
+                raise EncodingVersionMismatch(self.model_version, active_version)
+
+            if self._gallery is None or signature != self._signature:
+                self._gallery = load_gallery(self.chunk_size, self.model_version)
+                self._signature = signature
+            self._checked_at = time.monotonic()
+            return self._gallery
+
+    def check_version(self):
+        """
+        Check that this process embeds with the active encoding version
+
+        Called before enrolling faces, so new encodings are never stored
+        with a version that is not served. Needs an app context.
+
+        Raises:
+            EncodingVersionMismatch: If the active version is not this process's version
+        """
+        active_version = EncodingVersion.active_version()
+        if self.model_version is not None and active_version != self.model_version:
+            raise EncodingVersionMismatch(self.model_version, active_version)
+
+    def invalidate(self):
+        """Force a reload on the next access"""
+        with self._lock:
+            self._gallery = None
+
+    def _current_signature(self):
+        """
+        Get a cheap fingerprint of the stored encodings and users
+
+        Returns:
+            tuple: Active encoding version, encoding count, highest encoding ID and user count
+        """
+        query = db.session.query(
+            db.func.count(FaceEncoding.id),
+            db.func.max(FaceEncoding.id)
+        )
+        if self.model_version is not None:
+            query = query.filter(FaceEncoding.model_version == self.model_version)
+        encoding_count, max_encoding_id = query.one()
+        user_count = db.session.query(db.func.count(User.id)).scalar()
+        return EncodingVersion.active_version(), encoding_count, max_encoding_id, user_count
@@ -0,0 +1,189 @@
+import base64
+import binascii
+import struct
+import cv2
+import numpy as np
+from typing import Optional, Tuple
+
+# OpenCV flags decoding at 1/2, 1/4 and 1/8 resolution (DCT scaling for JPEG)
+REDUCED_DECODE_FLAGS = (
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2),
+)
+
+# JPEG start-of-frame markers carrying the image dimensions
+_JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+# JPEG markers without a length field
+_JPEG_STANDALONE_MARKERS = {0x01, 0xD8} | set(range(0xD0, 0xD8))
+
+class ImageDecodeError(ValueError):
+    """Raised when uploaded image data cannot or must not be decoded"""
+
+def _jpeg_size(data) -> Optional[Tuple[int, int]]:
+    """Read (width, height) from the first JPEG start-of-frame segment"""
+    i = 2
+    length = len(data)
+    while i + 9 < length:
+        if data[i] != 0xFF:
+            i += 1
+            continue
+        marker = data[i + 1]
+        if marker == 0xFF:
+            # Fill byte
+            i += 1
+            continue
+        if marker in _JPEG_STANDALONE_MARKERS:
+            i += 2
+            continue
+        if marker in _JPEG_SOF_MARKERS:
+            height, width = struct.unpack('>HH', data[i + 5:i + 9])
+            return width, height
+        segment_length = struct.unpack('>H', data[i + 2:i + 4])[0]
+        i += 2 + segment_length
+    return None
+
+def _webp_size(data) -> Optional[Tuple[int, int]]:
+    """Read (width, height) from a WebP VP8, VP8L or VP8X header"""
+    chunk = bytes(data[12:16])
+    if chunk == b'VP8 ' and len(data) >= 30:
+        width, height = struct.unpack('<HH', data[26:30])
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk == b'VP8L' and len(data) >= 25:
+        bits = struct.unpack('<I', data[21:25])[0]
+        return 1 + (bits & 0x3FFF), 1 + ((bits >> 14) & 0x3FFF)
+    if chunk == b'VP8X' and len(data) >= 30:
+        width = int.from_bytes(data[24:27], 'little') + 1
+        height = int.from_bytes(data[27:30], 'little') + 1
+        return width, height
+    return None
+
+def read_image_size(data) -> Optional[Tuple[int, int]]:
+    """
+    Read image dimensions from the file header without decoding pixels
+
+    Supports JPEG, PNG, WebP, BMP and GIF.
+
+    Args:
+        data (bytes): Encoded image
+
+    Returns:
+        Optional[Tuple[int, int]]: (width, height), or None if the format is not recognized
+    """
+    try:
+        if data[:3] == b'\xff\xd8\xff':
+            return _jpeg_size(data)
+        if data[:8] == b'\x89PNG\r\n\x1a\n' and len(data) >= 24:
+            return struct.unpack('>II', data[16:24])
+        if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+            return _webp_size(data)
+        if data[:2] == b'BM' and len(data) >= 26:
+            width, height = struct.unpack('<ii', data[18:26])
+            return abs(width), abs(height)
+        if data[:6] in (b'GIF87a', b'GIF89a') and len(data) >= 10:
+            return struct.unpack('<HH', data[6:10])
+    except struct.error:
+        return None
+    return None
+
+def guess_extension(data) -> Optional[str]:
+    """
+    Guess the file extension of an encoded image from its signature
+
+    Args:
+        data (bytes): Encoded image
+
+    Returns:
+        Optional[str]: Extension including the dot, or None if the format is not recognized
+    """
+    if data[:3] == b'\xff\xd8\xff':
+        return '.jpg'
+    if data[:8] == b'\x89PNG\r\n\x1a\n':
+        return '.png'
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return '.webp'
+    if data[:2] == b'BM':
+        return '.bmp'
+    if data[:6] in (b'GIF87a', b'GIF89a'):
+        return '.gif'
+    return None
+
+def decode_image(data, target_size: Optional[int] = 1280,
+                 max_pixels: int = 64_000_000) -> Tuple[np.ndarray, float]:
+    """
+    Decode an image at the smallest resolution that still reaches the target size
+
+    Dimensions are read from the header first, so oversized images (pixel bombs)
+    are rejected before any pixels are decoded. Large images are decoded with
+    OpenCV's reduced-resolution modes, which for JPEG scale in the DCT domain
+    and never materialize the full-resolution bitmap.
+
+    Args:
+        data (bytes): Encoded image (bytes, bytearray or memoryview, not copied)
+        target_size (Optional[int]): Minimum long side to keep, None for full resolution
+        max_pixels (int): Maximum declared width x height
+
+    Returns:
+        Tuple[numpy.ndarray, float]: BGR image and the factor mapping its
+                                     coordinates back to the original image
+
+    Raises:
+        ImageDecodeError: If the image is unrecognized, too large or corrupt
+    """
+    size = read_image_size(data)
+    if size is None:
+        raise ImageDecodeError('Invalid image data')
+
+    width, height = size
+    if width <= 0 or height <= 0:
+        raise ImageDecodeError('Invalid image data')
+    if width * height > max_pixels:
+        raise ImageDecodeError(f'Image is too large ({width}x{height} pixels)')
+
+    # Pick the strongest reduction that keeps the long side at or above the target
+    long_side = max(width, height)
+    factor, flags = 1, cv2.IMREAD_COLOR
+    if target_size:
+        for reduction, reduced_flags in REDUCED_DECODE_FLAGS:
+            if long_side // reduction >= target_size:
+                factor, flags = reduction, reduced_flags
+                break
+
+    image = cv2.imdecode(np.frombuffer(data, np.uint8), flags)
+    if image is None:
+        raise ImageDecodeError('Invalid image data')
+
+    scale = float(factor)
+
+    # Reduced decoding stops at 1/8, shrink whatever is still far above the target
+    if target_size and max(image.shape[:2]) > 2 * target_size:
+        resize = target_size / max(image.shape[:2])
+        image = cv2.resize(image, None, fx=resize, fy=resize, interpolation=cv2.INTER_AREA)
+        scale /= resize
+
+    return image, scale
+
+def decode_base64_image(image_data: str, max_bytes: Optional[int] = None, **kwargs) -> Tuple[np.ndarray, float]:
+    """
+    Decode a base64 encoded image with decode_image
+
+    Args:
+        image_data (str): Base64 encoded image
+        max_bytes (Optional[int]): Maximum decoded size, checked before decoding
+        **kwargs: Options passed to decode_image
+
+    Returns:
+        Tuple[numpy.ndarray, float]: BGR image and the factor mapping its
+                                     coordinates back to the original image
+
+    Raises:
+        ImageDecodeError: If the data is not valid base64 or not a valid image
+    """
+    if max_bytes and len(image_data) * 3 // 4 > max_bytes:
+        raise ImageDecodeError('Image data is too large')
+    try:
+        image_bytes = base64.b64decode(image_data)
+    except (binascii.Error, ValueError):
+        raise ImageDecodeError('Invalid image data')
+    return decode_image(image_bytes, **kwargs)
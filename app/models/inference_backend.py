@@ -0,0 +1,247 @@
+import os
+import copy
+import time
+import torch
+import numpy as np
+from typing import Callable, Dict, List, Optional
+
+# Supported FaceNet inference backends
+BACKENDS = ('eager', 'torchscript', 'quantized', 'onnx')
+
+# FaceNet input shape (C, H, W)
+FACENET_INPUT_SHAPE = (3, 160, 160)
+
+def configure_threads(intra_op_threads: Optional[int] = None, inter_op_threads: Optional[int] = None):
+    """
+    Configure PyTorch CPU thread pools for this worker process
+
+    Args:
+        intra_op_threads (Optional[int]): Threads used inside a single operator
+        inter_op_threads (Optional[int]): Threads used to run independent operators
+    """
+    if intra_op_threads:
+        torch.set_num_threads(intra_op_threads)
+    if inter_op_threads:
+        try:
+            torch.set_num_interop_threads(inter_op_threads)
+        except RuntimeError as e:
+            # Can only be set once, before any inter-op parallel work has started
+            print(f"Could not set inter-op threads: {e}")
+
+class TorchBackend:
+    """
+    FaceNet inference through a PyTorch module (eager, traced or quantized).
+
+    Attributes:
+        name (str): Backend name
+        module (torch.nn.Module): Module producing embeddings
+        device (str): Device the module runs on
+    """
+    def __init__(self, name: str, module: torch.nn.Module, device: str):
+        """
+        Initialize the backend
+
+        Args:
+            name (str): Backend name
+            module (torch.nn.Module): Module producing embeddings
+            device (str): Device the module runs on
+        """
+        self.name = name
+        self.module = module
+        self.device = device
+
+    def __call__(self, batch: torch.Tensor) -> np.ndarray:
+        """
+        Compute embeddings for a batch of preprocessed faces
+
+        Args:
+            batch (torch.Tensor): Faces of shape (N, 3, 160, 160)
+
+        Returns:
+            numpy.ndarray: Embeddings of shape (N, 512)
+        """
+        with torch.inference_mode():
+            return self.module(batch.to(self.device)).cpu().numpy()
+
+class OnnxBackend:
+    """
+    FaceNet inference through ONNX Runtime on CPU.
+
+    Attributes:
+        name (str): Backend name
+        session (onnxruntime.InferenceSession): ONNX Runtime session
+    """
+    name = 'onnx'
+
+    def __init__(self, model_path: str, intra_op_threads: Optional[int] = None,
+                 inter_op_threads: Optional[int] = None):
+        """
+        Initialize the backend
+
+        Args:
+            model_path (str): Path of the exported ONNX model
+            intra_op_threads (Optional[int]): Threads used inside a single operator
+            inter_op_threads (Optional[int]): Threads used to run independent operators
+        """
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise ImportError("The 'onnx' backend requires the onnxruntime package") from e
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if intra_op_threads:
+            options.intra_op_num_threads = intra_op_threads
+        if inter_op_threads:
+            options.inter_op_num_threads = inter_op_threads
+
+        self.session = ort.InferenceSession(model_path, options, providers=['CPUExecutionProvider'])
+        self._input_name = self.session.get_inputs()[0].name
+
+    def __call__(self, batch: torch.Tensor) -> np.ndarray:
+        """
+        Compute embeddings for a batch of preprocessed faces
+
+        Args:
+            batch (torch.Tensor): Faces of shape (N, 3, 160, 160)
+
+        Returns:
+            numpy.ndarray: Embeddings of shape (N, 512)
+        """
+        inputs = batch.detach().cpu().numpy().astype(np.float32, copy=False)
+        return self.session.run(None, {self._input_name: inputs})[0]
+
+def export_onnx(facenet: torch.nn.Module, model_path: str):
+    """
+    Export FaceNet to ONNX with a dynamic batch dimension
+
+    Args:
+        facenet (torch.nn.Module): Eager FaceNet model
+        model_path (str): Destination path of the ONNX model
+    """
+    os.makedirs(os.path.dirname(model_path) or '.', exist_ok=True)
+    example = torch.rand(1, *FACENET_INPUT_SHAPE)
+    torch.onnx.export(
+        copy.deepcopy(facenet).cpu().eval(),
+        example,
+        model_path,
+        input_names=['faces'],
+        output_names=['embeddings'],
+        dynamic_axes={'faces': {0: 'batch'}, 'embeddings': {0: 'batch'}},
+        opset_version=17
+    )
+
+def build_facenet_backend(facenet: torch.nn.Module, backend: str = 'eager', device: str = 'cpu',
+                          onnx_path: Optional[str] = None, intra_op_threads: Optional[int] = None,
+                          inter_op_threads: Optional[int] = None) -> Callable[[torch.Tensor], np.ndarray]:
+    """
+    Build a FaceNet inference backend from the eager model
+
+    Backends:
+    - eager: The model as loaded
+    - torchscript: Traced and frozen module with inference graph optimizations
+    - quantized: Dynamic int8 quantization (CPU only). PyTorch dynamic quantization
+      covers Linear layers only, so convolutions keep running in fp32.
+    - onnx: ONNX Runtime session, exported to onnx_path on first use
+
+    Args:
+        facenet (torch.nn.Module): Eager FaceNet model in eval mode
+        backend (str): Backend name, one of BACKENDS
+        device (str): Device to run torch backends on
+        onnx_path (Optional[str]): Path of the ONNX model for the onnx backend
+        intra_op_threads (Optional[int]): ONNX Runtime intra-op threads
+        inter_op_threads (Optional[int]): ONNX Runtime inter-op threads
+
+    Returns:
+        Callable mapping a (N, 3, 160, 160) tensor to (N, 512) embeddings
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown inference backend '{backend}', expected one of {BACKENDS}")
+
+    if backend == 'eager':
+        return TorchBackend(backend, facenet, device)
+
+    if backend == 'torchscript':
+        example = torch.rand(1, *FACENET_INPUT_SHAPE, device=device)
+        with torch.no_grad():
+            traced = torch.jit.trace(facenet, example)
+        module = torch.jit.optimize_for_inference(torch.jit.freeze(traced.eval()))
+        return TorchBackend(backend, module, device)
+
+    if backend == 'quantized':
+        if device != 'cpu':
+            raise ValueError("The 'quantized' backend only runs on CPU")
+        module = torch.ao.quantization.quantize_dynamic(
+            copy.deepcopy(facenet).cpu(), {torch.nn.Linear}, dtype=torch.qint8
+        )
+        return TorchBackend(backend, module, 'cpu')
+
+    if not onnx_path:
+        raise ValueError("The 'onnx' backend requires an ONNX model path")
+    if not os.path.exists(onnx_path):
+        export_onnx(facenet, onnx_path)
+    return OnnxBackend(onnx_path, intra_op_threads, inter_op_threads)
+
+def trace_mtcnn(mtcnn):
+    """
+    Replace the MTCNN stage networks with traced TorchScript modules in place
+
+    The stage networks are fully convolutional or use dynamic batch sizes, so
+    traced modules accept any input size.
+
+    Args:
+        mtcnn (MTCNN): MTCNN detector
+    """
+    device = next(mtcnn.pnet.parameters()).device
+    with torch.no_grad():
+        mtcnn.pnet = torch.jit.trace(mtcnn.pnet.eval(), torch.rand(1, 3, 48, 48, device=device))
+        mtcnn.rnet = torch.jit.trace(mtcnn.rnet.eval(), torch.rand(1, 3, 24, 24, device=device))
+        mtcnn.onet = torch.jit.trace(mtcnn.onet.eval(), torch.rand(1, 3, 48, 48, device=device))
+
+def compare_backends(facenet: torch.nn.Module, faces: torch.Tensor, backends: List[str],
+                     device: str = 'cpu', onnx_path: Optional[str] = None,
+                     tolerance: float = 0.01, repeats: int = 5) -> List[Dict]:
+    """
+    Compare backend embeddings and speed against the eager model
+
+    Args:
+        facenet (torch.nn.Module): Eager FaceNet model in eval mode
+        faces (torch.Tensor): Preprocessed faces of shape (N, 3, 160, 160)
+        backends (List[str]): Backend names to compare
+        device (str): Device to run torch backends on
+        onnx_path (Optional[str]): Path of the ONNX model for the onnx backend
+        tolerance (float): Maximum allowed cosine distance to the eager embeddings
+        repeats (int): Number of timed runs per backend
+
+    Returns:
+        List[Dict]: Per backend results with keys backend, ms_per_face,
+                    mean_cosine_distance, max_cosine_distance, within_tolerance
+    """
+    def normalize(embeddings):
+        return embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+
+    reference = normalize(TorchBackend('eager', facenet, device)(faces))
+
+    results = []
+    for name in backends:
+        backend = build_facenet_backend(facenet, name, device=device, onnx_path=onnx_path)
+
+        # Warm up (profiling executors and lazy initialization)
+        embeddings = backend(faces)
+        backend(faces)
+
+        start = time.perf_counter()
+        for _ in range(repeats):
+            embeddings = backend(faces)
+        elapsed = time.perf_counter() - start
+
+        distances = 1.0 - np.sum(normalize(embeddings) * reference, axis=1)
+        results.append({
+            'backend': name,
+            'ms_per_face': elapsed * 1000 / (repeats * len(faces)),
+            'mean_cosine_distance': float(distances.mean()),
+            'max_cosine_distance': float(distances.max()),
+            'within_tolerance': bool(distances.max() <= tolerance)
+        })
+
+    return results
@@ -0,0 +1,116 @@
+import asyncio
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from flask import current_app, has_app_context
+
+class InferencePoolFull(Exception):
+    """Raised when the inference pool has no free worker or queue slot"""
+
+class InferencePool:
+    """
+    Bounded thread pool for CPU-heavy inference.
+
+    At most `max_workers` jobs run at once and at most `max_queue` more wait for
+    a worker; further submissions fail fast with InferencePoolFull so callers can
+    answer 503 instead of piling up requests. Threads share one set of models
+    (PyTorch releases the GIL during inference).
+
+    Jobs submitted inside a Flask app context run inside a context of the same
+    app, so they can use the database session.
+
+    Attributes:
+        max_workers (int): Number of inference threads
+        max_queue (int): Number of jobs allowed to wait for a thread
+    """
+    def __init__(self, max_workers: int = 2, max_queue: int = 8):
+        """
+        Initialize the pool
+
+        Args:
+            max_workers (int): Number of inference threads
+            max_queue (int): Number of jobs allowed to wait for a thread
+        """
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix='inference')
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue)
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.rejected = 0
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        """
+        Submit a job to the pool
+
+        Args:
+            fn (Callable): Function to run
+            *args: Positional arguments for fn
+            **kwargs: Keyword arguments for fn
+
+        Returns:
+            Future: Resolves to the function result
+
+        Raises:
+            InferencePoolFull: If all worker and queue slots are taken
+        """
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise InferencePoolFull()
+
+        if has_app_context():
+            app = current_app._get_current_object()
+            job = fn
+
+            def fn(*args, **kwargs):
+                with app.app_context():
+                    return job(*args, **kwargs)
+
+        with self._lock:
+            self._pending += 1
+        try:
+            future = self._executor.submit(fn, *args, **kwargs)
+        except Exception:
+            self._release(None)
+            raise
+        future.add_done_callback(self._release)
+        return future
+
+    def run(self, fn, *args, **kwargs):
+        """
+        Run a job in the pool and wait for its result
+
+        Raises:
+            InferencePoolFull: If all worker and queue slots are taken
+        """
+        return self.submit(fn, *args, **kwargs).result()
+
+    async def run_async(self, fn, *args, **kwargs):
+        """
+        Run a job in the pool and await its result without blocking the event loop
+
+        Raises:
+            InferencePoolFull: If all worker and queue slots are taken
+        """
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def get_stats(self) -> dict:
+        """
+        Get pool occupancy
+
+        Returns:
+            dict: Pool limits, jobs running or queued, and rejected jobs
+        """
+        with self._lock:
+            return {
+                'max_workers': self.max_workers,
+                'max_queue': self.max_queue,
+                'pending': self._pending,
+                'rejected': self.rejected
+            }
+
+    def _release(self, _future):
+        """Free the slot of a finished job"""
+        with self._lock:
+            self._pending -= 1
+        self._slots.release()
@@ -0,0 +1,186 @@
+import time
+import queue
+import bisect
+import threading
+from collections import Counter
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Sequence
+
+# Upper bounds of the queue-wait histogram buckets in milliseconds
+WAIT_BUCKETS_MS = (0.5, 1, 2, 5, 10, 20, 50, 100, 250, 1000)
+
+class _Request:
+    """A queued item with its future and enqueue time"""
+    __slots__ = ('item', 'future', 'enqueued_at')
+
+    def __init__(self, item: Any):
+        self.item = item
+        self.future = Future()
+        self.enqueued_at = time.monotonic()
+
+class MicroBatcher:
+    """
+    Dynamic micro-batching scheduler for a batched model call.
+
+    Items submitted from concurrent callers are collected for up to `max_wait_ms`
+    after the first item arrives, or until `max_batch_size` items are queued,
+    and then run through `batch_fn` in a single call on a worker thread. Each
+    caller gets a future for its own result.
+
+    Attributes:
+        batch_fn (Callable): Maps a list of items to a list of results in the same order
+        max_batch_size (int): Maximum number of items per batch
+        max_wait_ms (float): Maximum time to wait for more items after the first one
+        name (str): Name used for the worker thread
+    """
+    def __init__(self, batch_fn: Callable[[List[Any]], Sequence[Any]], max_batch_size: int = 16,
+                 max_wait_ms: float = 5.0, name: str = 'micro-batcher'):
+        """
+        Initialize the scheduler and start its worker thread
+
+        Args:
+            batch_fn (Callable): Maps a list of items to a list of results in the same order
+            max_batch_size (int): Maximum number of items per batch
+            max_wait_ms (float): Maximum time to wait for more items after the first one
+            name (str): Name used for the worker thread
+        """
+        self.batch_fn = batch_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait_ms = max_wait_ms
+        self.name = name
+
+        self._queue = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self._batch_sizes = Counter()
+        self._wait_counts = [0] * (len(WAIT_BUCKETS_MS) + 1)
+        self._batches = 0
+        self._items = 0
+        self._run_seconds = 0.0
+
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, item: Any) -> Future:
+        """
+        Queue an item for the next batch
+
+        Args:
+            item (Any): Item to process
+
+        Returns:
+            Future: Resolves to the item's result, or raises the batch error
+        """
+        if self._stopped:
+            raise RuntimeError(f"{self.name} is stopped")
+        request = _Request(item)
+        self._queue.put(request)
+        return request.future
+
+    def __call__(self, item: Any) -> Any:
+        """
+        Process a single item, blocking until its batch has run
+
+        Args:
+            item (Any): Item to process
+
+        Returns:
+            Any: The item's result
+        """
+        return self.submit(item).result()
+
+    def stop(self):
+        """Stop the worker thread after the queued items have been processed"""
+        self._stopped = True
+        self._queue.put(None)
+        self._thread.join()
+
+    def get_stats(self) -> Dict:
+        """
+        Get batch-size and queue-wait histograms
+
+        Returns:
+            Dict: Batch counts per batch size, queue-wait counts per bucket
+                  (upper bound in ms, 'inf' for the overflow bucket) and totals
+        """
+        with self._stats_lock:
+            wait_histogram = {str(bound): count for bound, count in zip(WAIT_BUCKETS_MS, self._wait_counts)}
+            wait_histogram['inf'] = self._wait_counts[-1]
+            return {
+                'batches': self._batches,
+                'items': self._items,
+                'mean_batch_size': self._items / self._batches if self._batches else 0.0,
+                'mean_run_ms': 1000 * self._run_seconds / self._batches if self._batches else 0.0,
+                'batch_size_histogram': {str(size): count for size, count in sorted(self._batch_sizes.items())},
+                'queue_wait_ms_histogram': wait_histogram
+            }
+
+    def _collect(self, first: _Request) -> List[_Request]:
+        """
+        Collect a batch starting with the first queued request
+
+        Args:
+            first (_Request): Request that opened the batch window
+
+        Returns:
+            List[_Request]: Requests in the batch
+        """
+        batch = [first]
+        deadline = first.enqueued_at + self.max_wait_ms / 1000
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                # Past the deadline, still take whatever is already queued
+                request = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if request is None:
+                # Stop sentinel: finish this batch, then exit
+                self._queue.put(None)
+                break
+            batch.append(request)
+
+        return batch
+
+    def _run(self):
+        """Worker loop: collect a batch, run it and resolve its futures"""
+        while True:
+            first = self._queue.get()
+            if first is None:
+                break
+
+            batch = self._collect(first)
+            started = time.monotonic()
+
+            try:
+                results = self.batch_fn([request.item for request in batch])
+                if len(results) != len(batch):
+                    raise RuntimeError(f"{self.name}: batch function returned {len(results)} "
+                                       f"results for {len(batch)} items")
+            except Exception as e:
+                for request in batch:
+                    request.future.set_exception(e)
+            else:
+                for request, result in zip(batch, results):
+                    request.future.set_result(result)
+
+            self._record(batch, started, time.monotonic() - started)
+
+    def _record(self, batch: List[_Request], started: float, run_seconds: float):
+        """
+        Record batch size and queue waits in the histograms
+
+        Args:
+            batch (List[_Request]): Requests in the batch
+            started (float): Time the batch started running (time.monotonic)
+            run_seconds (float): Time spent in the batch function
+        """
+        with self._stats_lock:
+            self._batches += 1
+            self._items += len(batch)
+            self._run_seconds += run_seconds
+            self._batch_sizes[len(batch)] += 1
+            for request in batch:
+                wait_ms = 1000 * (started - request.enqueued_at)
+                self._wait_counts[bisect.bisect_left(WAIT_BUCKETS_MS, wait_ms)] += 1
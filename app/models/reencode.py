@@ -0,0 +1,286 @@
+import os
+import multiprocessing
+import numpy as np
+from typing import Callable, Dict, List, Optional, Tuple
+from .database import db, FaceEncoding, EncodingVersion
+from .image_decoding import ImageDecodeError, decode_image
+
+# Settings of the current pool worker process, set by _init_worker
+_worker_settings = {}
+
+def _init_worker(target_version: str, enrollment_dir: str, target_size: Optional[int], max_pixels: int):
+    """
+    Prepare a pool worker
+
+    Workers embed with the package-level face recognition system, which is
+    built from the environment inherited from the parent process.
+
+    Raises:
+        RuntimeError: If the worker's system produces another encoding version
+    """
+    from .. import face_recognition_system
+
+    if face_recognition_system.encoding_version != target_version:
+        raise RuntimeError(
+            f"Worker produces {face_recognition_system.encoding_version} encodings, expected {target_version}"
+        )
+    _worker_settings.update(
+        enrollment_dir=enrollment_dir,
+        target_size=target_size,
+        max_pixels=max_pixels
+    )
+
+def _encode_batch(batch: List[Tuple[int, int, str]]) -> List[Tuple[int, str, Optional[bytes]]]:
+    """
+    Re-embed a batch of enrollment images in a pool worker
+
+    Images go through the same decoding and full detection as enrollment, and the
+    first detected face of every image is embedded in one FaceNet batch.
+
+    Args:
+        batch (List[Tuple[int, int, str]]): (encoding ID, user ID, source image path) triples
+
+    Returns:
+        List[Tuple[int, str, Optional[bytes]]]: (user ID, source image path, float32
+            encoding bytes or None if the image is unreadable or has no face)
+    """
+    from .. import face_recognition_system
+
+    results = []
+    faces, keys = [], []
+    for _, user_id, source_path in batch:
+        try:
+            with open(os.path.join(_worker_settings['enrollment_dir'], source_path), 'rb') as f:
+                data = f.read()
+            image, _ = decode_image(
+                data,
+                target_size=_worker_settings['target_size'],
+                max_pixels=_worker_settings['max_pixels']
+            )
+        except (OSError, ImageDecodeError):
+            results.append((user_id, source_path, None))
+            continue
+
+        found, _ = face_recognition_system.detect_faces(image, use_cascade=False)
+        if not found:
+            results.append((user_id, source_path, None))
+            continue
+        faces.append(found[0])
+        keys.append((user_id, source_path))
+
+    embeddings = face_recognition_system.get_face_embeddings(faces)
+    for (user_id, source_path), embedding in zip(keys, embeddings):
+        vector = None if embedding is None else np.asarray(embedding, dtype=np.float32).tobytes()
+        results.append((user_id, source_path, vector))
+    return results
+
+def pending_sources(source_version: str, target_version: str):
+    """
+    Select source encodings whose image has no encoding of the target version yet
+
+    Args:
+        source_version (str): Version to re-encode from
+        target_version (str): Version to re-encode to
+
+    Returns:
+        Select: Statement selecting (id, user_id, source_image_path)
+    """
+    target = db.aliased(FaceEncoding)
+    return db.select(
+        FaceEncoding.id,
+        FaceEncoding.user_id,
+        FaceEncoding.source_image_path
+    ).filter(
+        FaceEncoding.model_version == source_version,
+        FaceEncoding.source_image_path.isnot(None),
+        ~db.exists().where(
+            target.model_version == target_version,
+            target.user_id == FaceEncoding.user_id,
+            target.source_image_path == FaceEncoding.source_image_path
+        )
+    )
+
+def _count(statement) -> int:
+    """Count the rows of a select statement"""
+    return db.session.execute(db.select(db.func.count()).select_from(statement.subquery())).scalar()
+
+def reencode_gallery(target_version: str, enrollment_dir: str, source_version: Optional[str] = None,
+                     workers: int = 2, batch_size: int = 32, chunk_size: int = 1024,
+                     target_size: Optional[int] = 1280, max_pixels: int = 64_000_000,
+                     switch: bool = True, force_switch: bool = False,
+                     progress: Optional[Callable[[Dict], None]] = None) -> Dict:
+    """
+    Re-embed the gallery's enrollment images as new-version encodings
+
+    Source encodings are read in keyset-paginated chunks, their images are
+    embedded in batches across a pool of worker processes, and each batch of
+    new rows is written with one bulk INSERT and committed. Old-version rows
+    are left in place, so matching continues on them until the switch. The job
+    is resumable: images that already have a target-version encoding are
+    skipped, so an interrupted run continues where it stopped.
+
+    Once no source image is left without a target-version encoding, the target
+    version is made active with a single UPDATE. Source encodings without a
+    retained image cannot be re-encoded and would drop out of the served
+    gallery (on a database from before versioning that is all of them), so
+    they also block the switch unless it is forced.
+
+    Args:
+        target_version (str): Version produced by the worker processes
+        enrollment_dir (str): Directory of retained enrollment images
+        source_version (Optional[str]): Version to re-encode from, the active one if None
+        workers (int): Worker processes, each with its own models
+        batch_size (int): Images per worker batch (FaceNet batch)
+        chunk_size (int): Source rows read per query
+        target_size (Optional[int]): Decoding target size, as used for enrollment
+        max_pixels (int): Maximum image pixels, as used for enrollment
+        switch (bool): Activate the target version when every image is re-encoded
+        force_switch (bool): Activate it even if some images could not be re-encoded
+                             or some encodings have no retained image
+        progress (Optional[Callable[[Dict], None]]): Called with the stats after each batch
+
+    Returns:
+        Dict: source_version, target_version, pending (source encodings lacking a
+              target-version encoding at start), encoded and failed (unreadable or
+              no face) images, without_source (source encodings without a retained
+              image), remaining (source encodings still lacking one) and switched
+
+    Raises:
+        ValueError: If source and target version are the same
+    """
+    source_version = source_version or EncodingVersion.active_version()
+    if source_version == target_version:
+        raise ValueError(f"Encodings are already at version {target_version}")
+
+    if db.session.get(EncodingVersion, target_version) is None:
+        db.session.add(EncodingVersion(version=target_version))
+        db.session.commit()
+
+    statement = pending_sources(source_version, target_version)
+    stats = {
+        'source_version': source_version,
+        'target_version': target_version,
+        'pending': _count(statement),
+        'encoded': 0,
+        'failed': 0,
+        'without_source': db.session.query(db.func.count(FaceEncoding.id)).filter(
+            FaceEncoding.model_version == source_version,
+            FaceEncoding.source_image_path.is_(None)
+        ).scalar(),
+        'remaining': 0,
+        'switched': False
+    }
+
+    # Spawn, not fork: forked PyTorch processes can deadlock on inherited thread state
+    context = multiprocessing.get_context('spawn')
+    with context.Pool(workers, initializer=_init_worker,
+                      initargs=(target_version, enrollment_dir, target_size, max_pixels)) as pool:
+        last_id = 0
+        while True:
+            rows = db.session.execute(
+                statement.filter(FaceEncoding.id > last_id).order_by(FaceEncoding.id).limit(chunk_size)
+            ).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+
+            # The same photo enrolled twice for a user is re-encoded once
+            unique = {}
+            for row in rows:
+                unique.setdefault((row.user_id, row.source_image_path), row)
+            items = [(row.id, row.user_id, row.source_image_path) for row in unique.values()]
+            batches = [items[i:i + batch_size] for i in range(0, len(items), batch_size)]
+
+            for results in pool.imap_unordered(_encode_batch, batches):
+                inserts = [{
+                    'user_id': user_id,
+                    'encoding_vector': vector,
+                    'model_version': target_version,
+                    'source_image_path': source_path
+                } for user_id, source_path, vector in results if vector is not None]
+
+                if inserts:
+                    # Bulk INSERT, one commit per batch
+                    db.session.execute(db.insert(FaceEncoding), inserts)
+                    db.session.commit()
+
+                stats['encoded'] += len(inserts)
+                stats['failed'] += len(results) - len(inserts)
+                if progress is not None:
+                    progress(stats)
+
+    stats['remaining'] = _count(statement)
+    complete = stats['remaining'] == 0 and stats['without_source'] == 0
+    if switch and (complete or force_switch):
+        EncodingVersion.activate(target_version)
+        stats['switched'] = True
+
+    return stats
+
+def prune_encodings(keep_version: str, enrollment_dir: Optional[str] = None,
+                    chunk_size: int = 1024) -> Tuple[int, int]:
+    """
+    Delete all face encodings of other versions than the active one
+
+    Only run this once every server has been redeployed with the active
+    version's configuration: it removes the encodings needed to switch back.
+    Enrollment images are shared between the versions of an encoding, so an
+    image is only deleted if no remaining encoding references it, i.e. it
+    could not be re-encoded. Encodings without a retained image are the only
+    copy of their face, so pruning refuses to run while other versions have any.
+
+    Args:
+        keep_version (str): Version to keep, must be the active one
+        enrollment_dir (Optional[str]): Directory of retained enrollment images;
+                                        images are left in place if None
+        chunk_size (int): Image paths checked per query
+
+    Returns:
+        Tuple[int, int]: Number of deleted encodings and deleted enrollment images
+
+    Raises:
+        ValueError: If keep_version is not the active version, or encodings of
+                    other versions have no retained image
+    """
+    active_version = EncodingVersion.active_version()
+    if keep_version != active_version:
+        raise ValueError(f"Cannot keep only {keep_version} encodings, {active_version} is active")
+
+    without_source = db.session.query(db.func.count(FaceEncoding.id)).filter(
+        FaceEncoding.model_version != keep_version,
+        FaceEncoding.source_image_path.is_(None)
+    ).scalar()
+    if without_source:
+        raise ValueError(f"{without_source} encodings of other versions have no retained image and would be "
+                         f"lost; delete those users first")
+
+    source_paths = set(db.session.execute(
+        db.select(FaceEncoding.source_image_path).filter(
+            FaceEncoding.model_version != keep_version,
+            FaceEncoding.source_image_path.isnot(None)
+        ).distinct()
+    ).scalars())
+
+    result = db.session.execute(
+        db.delete(FaceEncoding).where(FaceEncoding.model_version != keep_version)
+    )
+    db.session.commit()
+
+    removed = 0
+    if enrollment_dir is not None:
+        source_paths = sorted(source_paths)
+        for i in range(0, len(source_paths), chunk_size):
+            chunk = source_paths[i:i + chunk_size]
+            referenced = set(db.session.execute(
+                db.select(FaceEncoding.source_image_path).filter(FaceEncoding.source_image_path.in_(chunk))
+            ).scalars())
+            for source_path in chunk:
+                if source_path in referenced:
+                    continue
+                try:
+                    os.remove(os.path.join(enrollment_dir, source_path))
+                    removed += 1
+                except FileNotFoundError:
+                    pass
+
+    return result.rowcount, removed
@@ -0,0 +1,95 @@
+import numpy as np
+from datetime import datetime
+from typing import Dict, Optional
+from .database import db, FaceDump
+from .gallery import Gallery, EMBEDDING_DIM
+
+def reidentify_dumps(gallery: Gallery, user_id: Optional[int] = None,
+                     since: Optional[datetime] = None, until: Optional[datetime] = None,
+                     min_score: float = 0.0, chunk_size: int = 2048,
+                     gallery_block_size: int = 16384, dry_run: bool = False) -> Dict:
+    """
+    Re-match stored face dumps against the current gallery
+
+    Only dumps embedded with the gallery's encoding version are re-matched.
+    Dumps are read in keyset-paginated chunks of (id, user_id, score, embedding);
+    each chunk is scored against the gallery with blocked matrix products, so
+    memory stays bounded by chunk_size x gallery_block_size scores. Dumps whose
+    best match changed are updated with one bulk UPDATE per chunk.
+
+    Args:
+        gallery (Gallery): Current gallery of stored encodings
+        user_id (Optional[int]): Only re-match dumps currently assigned to this user
+        since (Optional[datetime]): Only re-match dumps created at or after this time
+        until (Optional[datetime]): Only re-match dumps created before this time
+        min_score (float): Leave dumps unchanged if their best match scores below this
+        chunk_size (int): Dumps scored per chunk
+        gallery_block_size (int): Gallery encodings scored per matrix product
+        dry_run (bool): Compute changes without writing them
+
+    Returns:
+        Dict: Numbers of dumps scanned, skipped (no embedding), reassigned to
+              another user, rescored, unchanged, and left as-is below min_score
+    """
+    stats = {'scanned': 0, 'skipped': 0, 'reassigned': 0, 'rescored': 0, 'unchanged': 0, 'below_min_score': 0}
+    if len(gallery) == 0:
+        return stats
+
+    statement = db.select(
+        FaceDump.id,
+        FaceDump.user_id,
+        FaceDump.similarity_score,
+        FaceDump.embedding
+    ).order_by(FaceDump.id)
+    if gallery.model_version is not None:
+        statement = statement.filter(FaceDump.model_version == gallery.model_version)
+    if user_id is not None:
+        statement = statement.filter(FaceDump.user_id == user_id)
+    if since is not None:
+        statement = statement.filter(FaceDump.created_at >= since)
+    if until is not None:
+        statement = statement.filter(FaceDump.created_at < until)
+
+    last_id = 0
+    while True:
+        rows = db.session.execute(statement.filter(FaceDump.id > last_id).limit(chunk_size)).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        stats['scanned'] += len(rows)
+
+        # Dumps recorded before embeddings were stored cannot be re-matched
+        scored = [row for row in rows if row.embedding is not None and len(row.embedding) == EMBEDDING_DIM * 2]
+        stats['skipped'] += len(rows) - len(scored)
+        rows = scored
+        if not rows:
+            continue
+
+        # Decode the float16 embeddings straight into one matrix
+        probes = np.frombuffer(b''.join(row.embedding for row in rows), dtype=np.float16)
+        probes = probes.reshape(len(rows), EMBEDDING_DIM).astype(np.float32)
+
+        best_indices, best_scores = gallery.best_matches(probes, gallery_block_size)
+
+        updates = []
+        for row, index, score in zip(rows, best_indices, best_scores):
+            score = float(score)
+            if index < 0 or score < min_score:
+                stats['below_min_score'] += 1
+                continue
+            new_user_id = int(gallery.user_ids[index])
+            if new_user_id != row.user_id:
+                stats['reassigned'] += 1
+            elif abs(score - row.similarity_score) > 1e-4:
+                stats['rescored'] += 1
+            else:
+                stats['unchanged'] += 1
+                continue
+            updates.append({'id': row.id, 'user_id': new_user_id, 'similarity_score': score})
+
+        if updates and not dry_run:
+            # Bulk UPDATE by primary key
+            db.session.execute(db.update(FaceDump), updates)
+            db.session.commit()
+
+    return stats
@@ -0,0 +1,325 @@
+import os
+import time
+import threading
+import cv2
+import numpy as np
+from collections import deque
+from typing import Callable, Dict, List, Optional, Tuple, Union
+from .database import db
+from .face_dumper import FaceDumper
+
+class CameraStream:
+    """
+    Capture thread for a single video source with a bounded latest-frame buffer.
+
+    The capture thread reads frames as fast as the source delivers them and keeps
+    only the newest `buffer_size` frames, so a slow consumer sees fresh frames
+    instead of an ever-growing backlog. Overwritten frames are counted as drops.
+
+    Attributes:
+        name (str): Camera name used in stats and dump throttling
+        source (Union[str, int]): RTSP/HTTP URL, video file path or device index
+        is_file (bool): Whether the source is a local video file
+        loop (bool): Restart video files from the beginning when they end
+        reconnect_delay (float): Seconds to wait before reopening a failed stream
+    """
+    def __init__(self, name: str, source: Union[str, int], buffer_size: int = 1,
+                 loop: bool = True, reconnect_delay: float = 2.0,
+                 frame_ready: Optional[threading.Event] = None):
+        """
+        Initialize the camera stream
+
+        Args:
+            name (str): Camera name
+            source (Union[str, int]): RTSP/HTTP URL, video file path or device index
+            buffer_size (int): Number of latest frames to keep
+            loop (bool): Restart video files from the beginning when they end
+            reconnect_delay (float): Seconds to wait before reopening a failed stream
+            frame_ready (Optional[threading.Event]): Event set whenever a frame arrives
+        """
+        if isinstance(source, str) and source.isdigit():
+            source = int(source)
+
+        self.name = name
+        self.source = source
+        self.is_file = isinstance(source, str) and os.path.isfile(source)
+        self.loop = loop
+        self.reconnect_delay = reconnect_delay
+
+        self._frames = deque(maxlen=buffer_size)
+        self._lock = threading.Lock()
+        self._frame_ready = frame_ready or threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+        # Counters since the last stats snapshot
+        self._captured = 0
+        self._processed = 0
+        self._throttled = 0
+        self._dropped = 0
+        self._lag_total = 0.0
+        self._lag_max = 0.0
+        self._stats_since = time.monotonic()
+        self.total_captured = 0
+        self.total_dropped = 0
+        self.connected = False
+
+    def start(self):
+        """Start the capture thread"""
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=f'capture-{self.name}', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """
+        Stop the capture thread
+
+        Args:
+            timeout (float): Seconds to wait for the thread to exit
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _open(self) -> cv2.VideoCapture:
+        """
+        Open the video source
+
+        Returns:
+            cv2.VideoCapture: Opened capture
+        """
+        capture = cv2.VideoCapture(self.source)
+        # Keep the driver-side queue short so frames are not stale
+        capture.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        return capture
+
+    def _run(self):
+        """Capture loop, reopening the source when it fails"""
+        while not self._stop.is_set():
+            capture = self._open()
+            if not capture.isOpened():
+                print(f"Camera {self.name}: could not open {self.source}")
+                self._stop.wait(self.reconnect_delay)
+                continue
+
+            self.connected = True
+            # Video files are paced at their native frame rate to behave like live cameras
+            frame_interval = 0.0
+            if self.is_file:
+                fps = capture.get(cv2.CAP_PROP_FPS)
+                frame_interval = 1.0 / fps if fps and fps > 0 else 1.0 / 25
+            next_frame_time = time.monotonic()
+
+            while not self._stop.is_set():
+                ok, frame = capture.read()
+                if not ok:
+                    break
+                self._push(frame)
+
+                if frame_interval:
+                    next_frame_time += frame_interval
+                    delay = next_frame_time - time.monotonic()
+                    if delay > 0:
+                        self._stop.wait(delay)
+                    else:
+                        next_frame_time = time.monotonic()
+
+            capture.release()
+            self.connected = False
+
+            if self.is_file and not self.loop:
+                break
+            if not self.is_file:
+                print(f"Camera {self.name}: stream ended, reconnecting")
+                self._stop.wait(self.reconnect_delay)
+
+    def _push(self, frame: np.ndarray):
+        """
+        Store a captured frame, dropping the oldest one when the buffer is full
+
+        Args:
+            frame (numpy.ndarray): Captured frame in BGR format
+        """
+        with self._lock:
+            if len(self._frames) == self._frames.maxlen:
+                self._dropped += 1
+                self.total_dropped += 1
+            self._frames.append((frame, time.monotonic()))
+            self._captured += 1
+            self.total_captured += 1
+        self._frame_ready.set()
+
+    def get_frame(self) -> Optional[Tuple[np.ndarray, float]]:
+        """
+        Take the newest frame out of the buffer
+
+        Older buffered frames are discarded and counted as drops.
+
+        Returns:
+            Optional[Tuple[numpy.ndarray, float]]: Frame and its capture time
+                                                   (time.monotonic), or None if empty
+        """
+        with self._lock:
+            if not self._frames:
+                return None
+            frame, captured_at = self._frames.pop()
+            stale = len(self._frames)
+            self._frames.clear()
+            self._dropped += stale
+            self.total_dropped += stale
+        return frame, captured_at
+
+    def mark_processed(self, captured_at: float):
+        """
+        Record that a frame finished processing
+
+        Args:
+            captured_at (float): Capture time of the frame (time.monotonic)
+        """
+        lag = time.monotonic() - captured_at
+        with self._lock:
+            self._processed += 1
+            self._lag_total += lag
+            self._lag_max = max(self._lag_max, lag)
+
+    def mark_throttled(self):
+        """Record that a frame was skipped because the camera's dump interval has not passed"""
+        with self._lock:
+            self._throttled += 1
+
+    def snapshot_stats(self) -> Dict:
+        """
+        Get stats since the previous snapshot and reset the interval counters
+
+        Returns:
+            Dict: Capture and processing FPS, throttled frames, drops and lag for this camera
+        """
+        now = time.monotonic()
+        with self._lock:
+            elapsed = max(now - self._stats_since, 1e-6)
+            stats = {
+                'camera': self.name,
+                'connected': self.connected,
+                'capture_fps': self._captured / elapsed,
+                'processed_fps': self._processed / elapsed,
+                'throttled': self._throttled,
+                'dropped': self._dropped,
+                'total_dropped': self.total_dropped,
+                'avg_lag_ms': 1000 * self._lag_total / self._processed if self._processed else 0.0,
+                'max_lag_ms': 1000 * self._lag_max
+            }
+            self._captured = self._processed = self._throttled = self._dropped = 0
+            self._lag_total = self._lag_max = 0.0
+            self._stats_since = now
+        return stats
+
+class StreamIngestionService:
+    """
+    Headless ingestion of many camera streams through one shared inference loop.
+
+    Each camera gets a lightweight capture thread; a single inference thread takes
+    the newest frame from each camera in turn and runs it through the shared
+    FaceDumper, so adding cameras never adds model copies.
+
+    Attributes:
+        app (Flask): Application providing the database context
+        face_dumper (FaceDumper): Shared face dumper (and its FaceRecognitionSystem)
+        cameras (List[CameraStream]): Ingested camera streams
+        on_results (Optional[Callable]): Called with (camera name, results) per processed frame
+    """
+    def __init__(self, app, face_dumper: FaceDumper, on_results: Optional[Callable[[str, List[dict]], None]] = None):
+        """
+        Initialize the ingestion service
+
+        Args:
+            app (Flask): Application providing the database context
+            face_dumper (FaceDumper): Shared face dumper
+            on_results (Optional[Callable]): Called with (camera name, results) per processed frame
+        """
+        self.app = app
+        self.face_dumper = face_dumper
+        self.on_results = on_results
+        self.cameras: List[CameraStream] = []
+        self._frame_ready = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def add_camera(self, name: str, source: Union[str, int], **kwargs) -> CameraStream:
+        """
+        Add a camera stream, starting it if the service is running
+
+        Args:
+            name (str): Camera name
+            source (Union[str, int]): RTSP/HTTP URL, video file path or device index
+            **kwargs: Extra CameraStream options
+
+        Returns:
+            CameraStream: The added camera
+        """
+        camera = CameraStream(name, source, frame_ready=self._frame_ready, **kwargs)
+        self.cameras.append(camera)
+        if self._thread is not None:
+            camera.start()
+        return camera
+
+    def start(self):
+        """Start all capture threads and the inference loop"""
+        self._stop.clear()
+        for camera in self.cameras:
+            camera.start()
+        self._thread = threading.Thread(target=self._run, name='inference', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the inference loop and all capture threads"""
+        self._stop.set()
+        self._frame_ready.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        for camera in self.cameras:
+            camera.stop()
+
+    def get_stats(self) -> List[Dict]:
+        """
+        Get per-camera stats since the previous call
+
+        Returns:
+            List[Dict]: Stats for each camera
+        """
+        return [camera.snapshot_stats() for camera in self.cameras]
+
+    def _run(self):
+        """Inference loop: round-robin over cameras, newest frame first"""
+        with self.app.app_context():
+            while not self._stop.is_set():
+                self._frame_ready.clear()
+                processed_any = False
+
+                for camera in list(self.cameras):
+                    if self._stop.is_set():
+                        break
+                    item = camera.get_frame()
+                    if item is None:
+                        continue
+                    frame, captured_at = item
+
+                    # Frames within the camera's dump interval are not run through detection
+                    if not self.face_dumper.should_dump(camera.name):
+                        camera.mark_throttled()
+                        continue
+
+                    try:
+                        results = self.face_dumper.process_frame(frame, source=camera.name)
+                    except Exception as e:
+                        db.session.rollback()
+                        print(f"Camera {camera.name}: error processing frame: {e}")
+                        results = []
+                    camera.mark_processed(captured_at)
+                    processed_any = True
+
+                    if self.on_results is not None and results:
+                        self.on_results(camera.name, results)
+
+                if not processed_any:
+                    self._frame_ready.wait(0.1)
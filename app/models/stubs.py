@@ -0,0 +1,142 @@
+import time
+import zlib
+import cv2
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+
+class StubFaceRecognitionSystem:
+    """
+    Drop-in replacement for FaceRecognitionSystem without any models.
+
+    Used for load tests of the server itself: it needs neither PyTorch nor
+    model weights, and simulates inference cost with a configurable sleep
+    (which, like PyTorch inference, releases the GIL). Every image yields one
+    centered face, and identical crops get identical embeddings, so matching,
+    dumping and dedup behave as they do with real frames.
+
+    Attributes:
+        device (str): Always 'cpu'
+        backend (str): Always 'stub'
+        encoding_version (str): Always 'stub', stub embeddings never match real ones
+        batcher (None): Stubs never batch
+        cascade (None): Stubs have no detection cascade
+        detect_ms (float): Simulated detection time per image
+        embed_ms (float): Simulated embedding time per face
+    """
+    def __init__(self, detect_ms: float = 0.0, embed_ms: float = 0.0, **kwargs):
+        """
+        Initialize the stub
+
+        Args:
+            detect_ms (float): Simulated detection time per image
+            embed_ms (float): Simulated embedding time per face
+            **kwargs: FaceRecognitionSystem options, ignored
+        """
+        self.device = 'cpu'
+        self.backend = 'stub'
+        self.encoding_version = 'stub'
+        self.batcher = None
+        self.cascade = None
+        self.detect_ms = detect_ms
+        self.embed_ms = embed_ms
+
+    def detect_faces(self, image: np.ndarray, use_cascade: bool = True) -> Tuple[List[np.ndarray], List[List[int]]]:
+        """
+        Return the central region of the image as a single face
+
+        Args:
+            image (numpy.ndarray): Input image in BGR format
+            use_cascade (bool): Ignored, stubs have no cascade
+
+        Returns:
+            Tuple containing:
+            - List with the face image (empty for images smaller than 20x20)
+            - List with its bounding box [x1, y1, x2, y2]
+        """
+        if self.detect_ms:
+            time.sleep(self.detect_ms / 1000)
+
+        height, width = image.shape[:2]
+        if height < 20 or width < 20:
+            return [], []
+        x1, y1, x2, y2 = width * 3 // 10, height * 2 // 10, width * 7 // 10, height * 8 // 10
+        return [image[y1:y2, x1:x2]], [[x1, y1, x2, y2]]
+
+    def get_face_embedding(self, face_image: np.ndarray) -> Optional[np.ndarray]:
+        """
+        Derive a deterministic pseudo-embedding from the face pixels
+
+        Args:
+            face_image (numpy.ndarray): Face image in BGR format
+
+        Returns:
+            Optional[numpy.ndarray]: Embedding vector of shape (512,)
+        """
+        if self.embed_ms:
+            time.sleep(self.embed_ms / 1000)
+
+        thumbnail = cv2.resize(face_image, (16, 16), interpolation=cv2.INTER_AREA)
+        seed = zlib.crc32(thumbnail.tobytes())
+        embedding = np.random.default_rng(seed).standard_normal(512).astype(np.float32)
+        return embedding / np.linalg.norm(embedding)
+
+    def get_face_embeddings(self, face_images: List[np.ndarray]) -> List[Optional[np.ndarray]]:
+        """
+        Generate pseudo-embeddings for several face images
+
+        Args:
+            face_images (List[numpy.ndarray]): Face images in BGR format
+
+        Returns:
+            List[Optional[numpy.ndarray]]: Embedding of shape (512,) per face
+        """
+        return [self.get_face_embedding(face) for face in face_images]
+
+    def compare_faces(self, embedding1: np.ndarray, embedding2: np.ndarray) -> float:
+        """
+        Compare two embeddings with cosine similarity
+
+        Args:
+            embedding1 (numpy.ndarray): First face embedding vector
+            embedding2 (numpy.ndarray): Second face embedding vector
+
+        Returns:
+            float: Cosine similarity
+        """
+        return float(np.dot(embedding1, embedding2) / (np.linalg.norm(embedding1) * np.linalg.norm(embedding2)))
+
+class StubEmotionDetector:
+    """
+    Drop-in replacement for EmotionDetector without the FER model.
+
+    Attributes:
+        emotions (Dict[str, float]): Emotion probabilities returned for every face
+    """
+    def __init__(self):
+        """Initialize the stub"""
+        self.emotions = {'angry': 0.0, 'disgust': 0.0, 'fear': 0.0, 'happy': 0.0,
+                         'sad': 0.0, 'surprise': 0.0, 'neutral': 1.0}
+
+    def detect_emotion(self, face_image: np.ndarray) -> Optional[Dict[str, float]]:
+        """
+        Return fixed emotion probabilities
+
+        Args:
+            face_image (numpy.ndarray): Face image in BGR format
+
+        Returns:
+            Optional[Dict[str, float]]: Emotion probabilities
+        """
+        return dict(self.emotions)
+
+    def get_dominant_emotion(self, emotions: Dict[str, float]) -> str:
+        """
+        Get the dominant emotion from emotion probabilities
+
+        Args:
+            emotions (Dict[str, float]): Dictionary of emotions and their probabilities
+
+        Returns:
+            str: Name of the dominant emotion
+        """
+        return max(emotions.items(), key=lambda x: x[1])[0]
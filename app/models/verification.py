@@ -0,0 +1,266 @@
+import os
+import time
+import cv2
+import numpy as np
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from .gallery import EMBEDDING_DIM
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp', '.webp'}
+
+# Histogram bins over the cosine similarity range [-1, 1]
+SCORE_BINS = 2000
+
+def load_labeled_dataset(root: str, limit_per_identity: Optional[int] = None) -> List[Tuple[str, str]]:
+    """
+    List the images of a folder-per-identity dataset
+
+    Args:
+        root (str): Dataset directory with one subdirectory of images per identity
+        limit_per_identity (Optional[int]): Maximum images used per identity
+
+    Returns:
+        List[Tuple[str, str]]: (image path relative to root, identity) pairs, sorted
+    """
+    items = []
+    for identity_dir in sorted(p for p in Path(root).iterdir() if p.is_dir()):
+        paths = sorted(p for p in identity_dir.rglob('*') if p.suffix.lower() in IMAGE_EXTENSIONS)
+        if limit_per_identity:
+            paths = paths[:limit_per_identity]
+        items.extend((str(path.relative_to(root)), identity_dir.name) for path in paths)
+    return items
+
+class EmbeddingCache:
+    """
+    On-disk cache of dataset embeddings in a single .npz file.
+
+    Entries are keyed by relative path, file size and modification time, so
+    edited or replaced images are embedded again. The file records the
+    encoding version it was built with, and a cache of another version is
+    discarded.
+
+    Attributes:
+        path (str): Cache file
+        version (Optional[str]): Encoding version of the cached embeddings
+        entries (Dict[str, Optional[numpy.ndarray]]): Embedding per key, None if no face was found
+    """
+    def __init__(self, path: str, version: Optional[str] = None):
+        """
+        Load the cache if it exists and matches the encoding version
+
+        Args:
+            path (str): Cache file
+            version (Optional[str]): Encoding version of the embedding model
+        """
+        self.path = path
+        self.version = version
+        self.entries = {}
+        if os.path.exists(path):
+            with np.load(path) as data:
+                cached_version = str(data['version']) if 'version' in data.files else None
+                if cached_version != version:
+                    return
+                for key, found, embedding in zip(data['keys'], data['found'], data['embeddings']):
+                    self.entries[str(key)] = embedding if found else None
+
+    @staticmethod
+    def key(root: str, relative_path: str) -> str:
+        """Build the cache key of a dataset image"""
+        stat = os.stat(os.path.join(root, relative_path))
+        return f"{relative_path}|{stat.st_size}|{stat.st_mtime_ns}"
+
+    def save(self):
+        """Write the cache atomically"""
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        keys = list(self.entries)
+        embeddings = np.zeros((len(keys), EMBEDDING_DIM), dtype=np.float32)
+        found = np.zeros(len(keys), dtype=bool)
+        for i, key in enumerate(keys):
+            if self.entries[key] is not None:
+                embeddings[i] = self.entries[key]
+                found[i] = True
+        tmp_path = self.path + '.tmp.npz'
+        extra = {} if self.version is None else {'version': np.array(self.version)}
+        np.savez(tmp_path, keys=np.array(keys), found=found, embeddings=embeddings, **extra)
+        os.replace(tmp_path, self.path)
+
+def embed_dataset(system, root: str, items: List[Tuple[str, str]], cache: Optional[EmbeddingCache] = None,
+                  batch_size: int = 64, detect: bool = True) -> Tuple[np.ndarray, np.ndarray, Dict]:
+    """
+    Embed dataset images in FaceNet batches, reusing cached embeddings
+
+    The largest detected face of each image is used; with detect=False the
+    whole image is taken as an already cropped face.
+
+    Args:
+        system (FaceRecognitionSystem): Face recognition system
+        root (str): Dataset directory
+        items (List[Tuple[str, str]]): (relative path, identity) pairs
+        cache (Optional[EmbeddingCache]): Embedding cache, updated in place
+        batch_size (int): Faces per FaceNet batch
+        detect (bool): Detect faces instead of using whole images
+
+    Returns:
+        Tuple containing:
+        - Normalized embeddings of shape (N, 512) for images with a face
+        - Identity label per embedding
+        - Stats: images, cached, detected, embedded, no_face, detect_seconds, embed_seconds
+    """
+    stats = {'images': len(items), 'cached': 0, 'detected': 0, 'embedded': 0, 'no_face': 0,
+             'detect_seconds': 0.0, 'embed_seconds': 0.0}
+    embeddings = [None] * len(items)
+    pending = []  # (item index, cache key, face crop)
+
+    def flush():
+        started = time.perf_counter()
+        batch = system.get_face_embeddings([face for _, _, face in pending])
+        stats['embed_seconds'] += time.perf_counter() - started
+        for (index, key, _), embedding in zip(pending, batch):
+            if embedding is not None:
+                embedding = embedding / np.linalg.norm(embedding)
+            embeddings[index] = embedding
+            if cache is not None:
+                cache.entries[key] = embedding
+        stats['embedded'] += len(pending)
+        pending.clear()
+
+    for index, (relative_path, _) in enumerate(items):
+        key = EmbeddingCache.key(root, relative_path)
+        if cache is not None and key in cache.entries:
+            embeddings[index] = cache.entries[key]
+            stats['cached'] += 1
+            continue
+
+        image = cv2.imread(os.path.join(root, relative_path), cv2.IMREAD_COLOR)
+        face = image
+        if image is not None and detect:
+            started = time.perf_counter()
+            faces, boxes = system.detect_faces(image)
+            stats['detect_seconds'] += time.perf_counter() - started
+            stats['detected'] += 1
+            areas = [(x2 - x1) * (y2 - y1) for x1, y1, x2, y2 in boxes]
+            face = faces[int(np.argmax(areas))] if faces else None
+
+        if face is None:
+            if cache is not None:
+                cache.entries[key] = None
+            continue
+
+        pending.append((index, key, face))
+        if len(pending) >= batch_size:
+            flush()
+
+    if pending:
+        flush()
+
+    kept = [i for i, embedding in enumerate(embeddings) if embedding is not None]
+    stats['no_face'] = len(items) - len(kept)
+    if not kept:
+        return np.zeros((0, EMBEDDING_DIM), dtype=np.float32), np.array([]), stats
+    labels = np.array([items[i][1] for i in kept])
+    return np.stack([embeddings[i] for i in kept]).astype(np.float32), labels, stats
+
+def score_histograms(embeddings: np.ndarray, labels: np.ndarray,
+                     block_size: int = 4096, bins: int = SCORE_BINS) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Score all pairs of embeddings and histogram genuine and impostor scores
+
+    Pairs are scored with blocked matrix products over the upper triangle, so
+    memory stays bounded by block_size x block_size scores and millions of
+    pairs never need to be stored.
+
+    Args:
+        embeddings (numpy.ndarray): Normalized embeddings of shape (N, 512)
+        labels (numpy.ndarray): Identity label per embedding
+        block_size (int): Embeddings per block
+        bins (int): Histogram bins over the score range [-1, 1]
+
+    Returns:
+        Tuple[numpy.ndarray, numpy.ndarray]: Genuine and impostor pair counts per bin
+    """
+    _, label_ids = np.unique(labels, return_inverse=True)
+    genuine = np.zeros(bins, dtype=np.int64)
+    impostor = np.zeros(bins, dtype=np.int64)
+    count = len(embeddings)
+
+    for i in range(0, count, block_size):
+        rows = embeddings[i:i + block_size]
+        row_labels = label_ids[i:i + block_size]
+        for j in range(i, count, block_size):
+            scores = rows @ embeddings[j:j + block_size].T
+            indices = np.clip(((scores + 1.0) * (bins / 2)).astype(np.int64), 0, bins - 1)
+            same = row_labels[:, None] == label_ids[j:j + block_size][None, :]
+
+            valid = None
+            if i == j:
+                # Each pair once, without self-pairs
+                valid = np.triu(np.ones(scores.shape, dtype=bool), k=1)
+
+            genuine_mask = same if valid is None else same & valid
+            impostor_mask = ~same if valid is None else ~same & valid
+            genuine += np.bincount(indices[genuine_mask], minlength=bins)
+            impostor += np.bincount(indices[impostor_mask], minlength=bins)
+
+    return genuine, impostor
+
+def error_rates(genuine: np.ndarray, impostor: np.ndarray, thresholds: List[float]) -> List[Dict]:
+    """
+    Compute verification error rates at score thresholds
+
+    Args:
+        genuine (numpy.ndarray): Genuine pair counts per bin
+        impostor (numpy.ndarray): Impostor pair counts per bin
+        thresholds (List[float]): Score thresholds
+
+    Returns:
+        List[Dict]: Per threshold: threshold, far (impostors accepted), frr
+                    (genuine pairs rejected) and tar (1 - frr)
+    """
+    bins = len(genuine)
+    # Pairs scoring at or above each bin's lower edge
+    genuine_above = np.cumsum(genuine[::-1])[::-1]
+    impostor_above = np.cumsum(impostor[::-1])[::-1]
+    genuine_total = max(int(genuine.sum()), 1)
+    impostor_total = max(int(impostor.sum()), 1)
+
+    rows = []
+    for threshold in thresholds:
+        index = min(bins - 1, max(0, int(round((threshold + 1.0) * (bins / 2)))))
+        far = impostor_above[index] / impostor_total
+        frr = 1.0 - genuine_above[index] / genuine_total
+        rows.append({'threshold': float(threshold), 'far': float(far), 'frr': float(frr), 'tar': float(1.0 - frr)})
+    return rows
+
+def roc_summary(genuine: np.ndarray, impostor: np.ndarray, target_fars=(1e-2, 1e-3, 1e-4)) -> Dict:
+    """
+    Summarize the ROC curve of genuine and impostor score histograms
+
+    Args:
+        genuine (numpy.ndarray): Genuine pair counts per bin
+        impostor (numpy.ndarray): Impostor pair counts per bin
+        target_fars (Iterable[float]): FARs to report the operating point for
+
+    Returns:
+        Dict: eer and eer_threshold, and per target FAR the lowest threshold
+              reaching it with its TAR
+    """
+    bins = len(genuine)
+    edges = np.round(np.arange(bins) * (2.0 / bins) - 1.0, 6)
+    rows = error_rates(genuine, impostor, list(edges))
+    far = np.array([row['far'] for row in rows])
+    frr = np.array([row['frr'] for row in rows])
+
+    eer_index = int(np.argmin(np.abs(far - frr)))
+    summary = {
+        'eer': float((far[eer_index] + frr[eer_index]) / 2),
+        'eer_threshold': float(edges[eer_index]),
+        'operating_points': []
+    }
+    for target in target_fars:
+        reached = np.nonzero(far <= target)[0]
+        if len(reached):
+            index = int(reached[0])
+            summary['operating_points'].append({
+                'far': float(target), 'threshold': float(edges[index]), 'tar': float(1.0 - frr[index])
+            })
+    return summary
@@ -1,39 +1,159 @@
-from flask import Blueprint, render_template, request, jsonify
-import cv2
-import numpy as np
-from .. import face_recognition_system
+import os
+from flask import Blueprint, current_app, render_template, request, jsonify
+from .. import face_recognition_system, gallery_cache, inference_pool
+from ..config import Config
 from ..models.database import db, User, FaceEncoding
+from ..models.dump_storage import DumpStorage
+from ..models.gallery import EncodingVersionMismatch
+from ..models.image_decoding import ImageDecodeError, decode_image, guess_extension
+from ..models.inference_pool import InferencePoolFull
 
 admin_bp = Blueprint('admin', __name__)
 
+# Enrollment images are kept so the gallery can be re-encoded with a new model
+enrollment_storage = DumpStorage(Config.ENROLLMENT_FOLDER)
+
+# Page size bounds for the user listing
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+def _decode_upload(image_file):
+    """
+    Read an uploaded image file and decode it at the resolution needed for detection
+    
+    Args:
+        image_file (FileStorage): Uploaded image file
+    
+    Returns:
+        Tuple[bytes, numpy.ndarray]: Uploaded file contents and the image in BGR format
+    
+    Raises:
+        ImageDecodeError: If the image is unrecognized, too large or corrupt
+    """
+    data = image_file.read()
+    image = decode_image(
+        data,
+        target_size=current_app.config['IMAGE_DECODE_TARGET_SIZE'],
+        max_pixels=current_app.config['MAX_IMAGE_PIXELS']
+    )[0]
+    return data, image
+
+def _new_face_encoding(embedding, data, **kwargs):
+    """
+    Create a face encoding tagged with the current encoding version
+    
+    The uploaded image is retained as the encoding's source image.
+    
+    Args:
+        embedding (numpy.ndarray): Face embedding vector
+        data (bytes): Uploaded image file contents
+        **kwargs: FaceEncoding column values
+    
+    Returns:
+        FaceEncoding: New, unsaved face encoding
+    """
+    source_path = enrollment_storage.store(data, guess_extension(data) or '.img')
+    face_encoding = FaceEncoding(
+        model_version=face_recognition_system.encoding_version,
+        source_image_path=enrollment_storage.relative_path(source_path),
+        **kwargs
+    )
+    face_encoding.set_encoding(embedding)
+    return face_encoding
+
+def _commit_enrollment(face_encoding=None):
+    """
+    Commit the session, removing the new encoding's source image if the commit fails
+    
+    Identical uploads share one content-addressed file, so the image is only
+    removed if no committed encoding references it.
+    
+    Args:
+        face_encoding (Optional[FaceEncoding]): Face encoding added in this session
+    """
+    source_path = face_encoding.source_image_path if face_encoding is not None else None
+    try:
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        if source_path is not None:
+            referenced = db.session.query(
+                FaceEncoding.query.filter_by(source_image_path=source_path).exists()
+            ).scalar()
+            if not referenced:
+                try:
+                    os.remove(os.path.join(enrollment_storage.base_dir, source_path))
+                except FileNotFoundError:
+                    pass
+        raise
+
+def _embed_first_face(image):
+    """
+    Detect faces in an image and embed the first one
+    
+    Args:
+        image (numpy.ndarray): Image in BGR format
+    
+    Returns:
+        Tuple[bool, Optional[numpy.ndarray]]: Whether a face was found, and its
+                                             embedding or None if embedding failed
+    """
+    # Enrollment photos always get full MTCNN detection
+    faces, _ = face_recognition_system.detect_faces(image, use_cascade=False)
+    if not faces:
+        return False, None
+    return True, face_recognition_system.get_face_embedding(faces[0])
+
 @admin_bp.route('/')
 def index():
     """
     Render the admin interface for managing users and face encodings
     
+    The user list itself is loaded page by page from /admin/users.
+    
     Returns:
-        HTML template: Rendered admin/index.html template with list of users
+        HTML template: Rendered admin/index.html template
     """
-    users = User.query.all()
-    return render_template('admin/index.html', users=users)
+    return render_template('admin/index.html', page_size=DEFAULT_PAGE_SIZE)
 
 @admin_bp.route('/users', methods=['GET'])
 def list_users():
     """
-    Get list of all users with their face encoding counts
+    Get a page of users with their face encoding counts
+    
+    Query parameters:
+        - after: Return users with an ID greater than this (keyset cursor)
+        - q: Optional name prefix to search for
+        - limit: Page size (default 50, max 500)
     
     Returns:
-        JSON response with list of users containing:
-        - id: User ID
-        - name: User's name
-        - face_count: Number of face encodings for the user
-    """
-    users = User.query.all()
-    return jsonify([{
-        'id': user.id,
-        'name': user.name,
-        'face_count': len(user.face_encodings)
-    } for user in users])
+        JSON response with:
+        - users: List of users containing id, name and face_count
+        - next_after: Cursor for the next page, or null on the last page
+    """
+    after_id = request.args.get('after', type=int)
+    name_prefix = request.args.get('q', '').strip()
+    limit = request.args.get('limit', DEFAULT_PAGE_SIZE, type=int)
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    
+    # Fetch one extra row to know whether another page exists
+    rows = User.page_with_face_counts(
+        after_id=after_id,
+        name_prefix=name_prefix,
+        limit=limit + 1,
+        model_version=face_recognition_system.encoding_version
+    )
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    
+    return jsonify({
+        'users': [{
+            'id': user_id,
+            'name': name,
+            'face_count': int(face_count)
+        } for user_id, name, face_count in rows],
+        'next_after': rows[-1][0] if has_more else None
+    })
 
 @admin_bp.route('/users', methods=['POST'])
 def create_user():
@@ -63,35 +183,42 @@ def create_user():
         db.session.add(user)
         
         # Process face image if provided
+        face_encoding = None
         if 'face_image' in request.files:
+            # Only enroll with the version that is being served
+            gallery_cache.check_version()
+            
             image_file = request.files['face_image']
-            # Read image file
-            image_bytes = image_file.read()
-            nparr = np.frombuffer(image_bytes, np.uint8)
-            image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+            # Read and decode image file
+            try:
+                data, image = _decode_upload(image_file)
+            except ImageDecodeError as e:
+                db.session.rollback()
+                return jsonify({'error': str(e)}), 400
             
-            # Detect face
-            faces, _ = face_recognition_system.detect_faces(image)
-            if not faces:
+            # Detect face and get face embedding on the inference pool
+            found, embedding = inference_pool.run(_embed_first_face, image)
+            if not found:
                 return jsonify({'error': 'No face detected in image'}), 400
             
-            # Get face embedding
-            embedding = face_recognition_system.get_face_embedding(faces[0])
             if embedding is None:
                 return jsonify({'error': 'Failed to generate face embedding'}), 400
             
             # Create face encoding
-            face_encoding = FaceEncoding()
-            face_encoding.set_encoding(embedding)
+            face_encoding = _new_face_encoding(embedding, data)
             user.face_encodings.append(face_encoding)
         
-        db.session.commit()
+        _commit_enrollment(face_encoding)
+        gallery_cache.invalidate()
         return jsonify({
             'id': user.id,
             'name': user.name,
-            'face_count': len(user.face_encodings)
+            'face_count': user.face_count(face_recognition_system.encoding_version)
         })
     
+    except (InferencePoolFull, EncodingVersionMismatch):
+        db.session.rollback()
+        raise
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -121,33 +248,38 @@ def add_face(user_id):
         if 'face_image' not in request.files:
             return jsonify({'error': 'No face image provided'}), 400
         
+        # Only enroll with the version that is being served
+        gallery_cache.check_version()
+        
         image_file = request.files['face_image']
-        image_bytes = image_file.read()
-        nparr = np.frombuffer(image_bytes, np.uint8)
-        image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+        try:
+            data, image = _decode_upload(image_file)
+        except ImageDecodeError as e:
+            return jsonify({'error': str(e)}), 400
         
-        # Detect face
-        faces, _ = face_recognition_system.detect_faces(image)
-        if not faces:
+        # Detect face and get face embedding on the inference pool
+        found, embedding = inference_pool.run(_embed_first_face, image)
+        if not found:
             return jsonify({'error': 'No face detected in image'}), 400
         
-        # Get face embedding
-        embedding = face_recognition_system.get_face_embedding(faces[0])
         if embedding is None:
             return jsonify({'error': 'Failed to generate face embedding'}), 400
         
-        # Create face encoding
-        face_encoding = FaceEncoding()
-        face_encoding.set_encoding(embedding)
-        user.face_encodings.append(face_encoding)
+        # Create face encoding without loading the user's existing encodings
+        face_encoding = _new_face_encoding(embedding, data, user_id=user.id)
+        db.session.add(face_encoding)
         
-        db.session.commit()
+        _commit_enrollment(face_encoding)
+        gallery_cache.invalidate()
         return jsonify({
             'id': user.id,
             'name': user.name,
-            'face_count': len(user.face_encodings)
+            'face_count': user.face_count(face_recognition_system.encoding_version)
         })
     
+    except (InferencePoolFull, EncodingVersionMismatch):
+        db.session.rollback()
+        raise
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -168,6 +300,7 @@ def delete_user(user_id):
         user = User.query.get_or_404(user_id)
         db.session.delete(user)
         db.session.commit()
+        gallery_cache.invalidate()
         return '', 204
     
     except Exception as e:
@@ -1,14 +1,35 @@
-from flask import Blueprint, render_template, jsonify, request, send_from_directory
-import cv2
+from flask import Blueprint, current_app, render_template, jsonify, request, send_from_directory, url_for
 import numpy as np
-import base64
 import os
-from .. import face_recognition_system
-from ..models.database import db, User, FaceEncoding, FaceDump
+from typing import List, Tuple
+from .. import face_recognition_system, gallery_cache, inference_pool
+from ..config import Config
+from ..models.database import db, User, FaceDump
+from ..models.dump_storage import DumpStorage
 from ..models.face_dumper import FaceDumper
+from ..models.gallery import EncodingVersionMismatch, Gallery, GalleryMatch
+from ..models.image_decoding import ImageDecodeError, decode_base64_image
+from ..models.inference_pool import InferencePoolFull
 
 main_bp = Blueprint('main', __name__)
-face_dumper = FaceDumper()
+
+emotion_detector = None
+if Config.USE_MODEL_STUBS:
+    from ..models.stubs import StubEmotionDetector
+    emotion_detector = StubEmotionDetector()
+
+face_dumper = FaceDumper(
+    dump_dir=Config.DUMP_FOLDER,
+    image_format=Config.DUMP_IMAGE_FORMAT,
+    image_quality=Config.DUMP_IMAGE_QUALITY,
+    max_crop_size=Config.DUMP_MAX_CROP_SIZE,
+    dedup_similarity=Config.DUMP_DEDUP_SIMILARITY,
+    dedup_window=Config.DUMP_DEDUP_WINDOW,
+    dedup_history=Config.DUMP_DEDUP_HISTORY,
+    face_recognition=face_recognition_system,
+    gallery=gallery_cache,
+    emotion_detector=emotion_detector
+)
 
 @main_bp.route('/')
 def index():
@@ -25,19 +46,144 @@ def serve_upload(filename):
     """
     Serve uploaded files from the uploads directory
     
+    Uploads may change, so they get a short cache lifetime and are
+    revalidated by modification time.
+    
     Args:
         filename (str): Path to the file within uploads directory
     
     Returns:
-        File response
-    """
-    # Check if the file is in the dumps directory
-    if filename.startswith('dumps/'):
-        uploads_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'uploads')
-        return send_from_directory(uploads_dir, filename)
-    else:
-        uploads_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'uploads')
-        return send_from_directory(uploads_dir, filename)
+        File response, or 304 Not Modified if the client copy is current
+    """
+    uploads_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'uploads')
+    return send_from_directory(uploads_dir, filename, max_age=Config.UPLOAD_CACHE_MAX_AGE)
+
+@main_bp.route('/dumps/<path:filename>')
+def serve_dump(filename):
+    """
+    Serve face dump images from the dump storage, wherever DUMP_FOLDER points
+    
+    Content-addressed dumps never change, so they are served with their
+    content hash as ETag and a long-lived immutable Cache-Control.
+    
+    Args:
+        filename (str): Path to the image relative to the dump storage root
+    
+    Returns:
+        File response, or 304 Not Modified if the client copy is current
+    """
+    digest = DumpStorage.digest_from_path(filename)
+    if not digest:
+        return send_from_directory(face_dumper.storage.base_dir, filename, max_age=Config.UPLOAD_CACHE_MAX_AGE)
+    
+    response = send_from_directory(face_dumper.storage.base_dir, filename, etag=digest,
+                                   max_age=Config.DUMP_CACHE_MAX_AGE)
+    response.cache_control.immutable = True
+    return response
+
+def analyze_image(image: np.ndarray, gallery: Gallery) -> Tuple[List[Tuple[List[int], GalleryMatch]], List[dict]]:
+    """
+    Run the inference half of recognition on a decoded image
+    
+    Runs face detection, embedding, matching against an already loaded
+    gallery and the face dumper's emotion detection. It touches neither the
+    database nor the dump storage, so it is what runs on the inference pool.
+    
+    Args:
+        image (numpy.ndarray): Image in BGR format
+        gallery (Gallery): Gallery snapshot from gallery_cache.get()
+    
+    Returns:
+        Tuple containing:
+        - (box, match) of each embedded face
+        - Dump candidates for face_dumper.write_dumps
+    """
+    faces, boxes = face_recognition_system.detect_faces(image)
+    if not faces:
+        return [], []
+    
+    # Get embeddings for all detected faces in one batch
+    embeddings = face_recognition_system.get_face_embeddings(faces)
+    indices = [i for i, embedding in enumerate(embeddings) if embedding is not None]
+    if not indices:
+        return [], []
+    
+    # Compare with stored faces in one matrix product
+    matches = [None] * len(faces)
+    for i, match in zip(indices, gallery.match_many(np.stack([embeddings[i] for i in indices]))):
+        matches[i] = match
+    
+    candidates = face_dumper.analyze_faces(faces, boxes, embeddings, matches)
+    
+    # Convert numpy int values to Python int
+    detected = [([int(x) for x in boxes[i]], matches[i]) for i in indices]
+    return detected, candidates
+
+def finish_recognition(detected: List[Tuple[List[int], GalleryMatch]], candidates: List[dict],
+                       scale: float = 1.0) -> List[dict]:
+    """
+    Write face dumps and build the recognition results of analyze_image
+    
+    Needs an app context for database access.
+    
+    Args:
+        detected (List[Tuple[List[int], GalleryMatch]]): (box, match) of each embedded face
+        candidates (List[dict]): Dump candidates
+        scale (float): Factor mapping image coordinates back to the uploaded
+                       image, for images decoded at reduced resolution
+    
+    Returns:
+        List[dict]: Detected faces with recognition results, boxes in
+                    uploaded image coordinates
+    """
+    dump_results = face_dumper.write_dumps(candidates, scale)
+    threshold = current_app.config['FACE_RECOGNITION_THRESHOLD']
+    
+    results = []
+    for box, match in detected:
+        best_score = match.score
+        box = [int(round(x * scale)) for x in box] if scale != 1.0 else box
+        
+        # Find matching dump result if any
+        dump_result = next((r for r in dump_results if r['box'] == box), None)
+        
+        # Add result
+        result = {
+            'box': box,
+            'recognized': bool(best_score > threshold),  # Convert to Python bool
+            'name': match.name if match.user_id is not None and best_score > threshold else 'Unknown',
+            'confidence': best_score,
+            'emotion': dump_result['emotion'] if dump_result else None,
+            'similarity': dump_result['similarity'] if dump_result else None
+        }
+        results.append(result)
+    
+    return results
+
+def recognize_image(image: np.ndarray, scale: float = 1.0) -> List[dict]:
+    """
+    Recognize faces in a decoded image and match them against stored faces
+    
+    Only analyze_image runs on the bounded inference pool; loading the
+    gallery and writing dumps run on the calling thread, which needs an app
+    context for database access.
+    
+    Args:
+        image (numpy.ndarray): Image in BGR format
+        scale (float): Factor mapping image coordinates back to the uploaded
+                       image, for images decoded at reduced resolution
+    
+    Returns:
+        List[dict]: Detected faces with recognition results, boxes in
+                    uploaded image coordinates
+    
+    Raises:
+        InferencePoolFull: If the inference pool has no free slot
+        EncodingVersionMismatch: If this process does not embed with the active version
+    """
+    gallery = gallery_cache.get()
+    detected, candidates = inference_pool.run(analyze_image, image, gallery)
+    return finish_recognition(detected, candidates, scale)
 
 @main_bp.route('/api/recognize', methods=['POST'])
 def recognize_face():
@@ -57,7 +203,8 @@ def recognize_face():
     Returns:
         JSON response with:
         - faces: List of detected faces with recognition results
-        - error: Error message if something went wrong
+        - error: Error message if something went wrong (503 if the inference pool is full
+                 or this server's encoding version is not the active one)
     """
     try:
         # Get image data from request
@@ -65,65 +212,24 @@ def recognize_face():
         if not image_data:
             return jsonify({'error': 'No image data provided'}), 400
         
-        # Convert base64 to numpy array
-        image_bytes = base64.b64decode(image_data)
-        nparr = np.frombuffer(image_bytes, np.uint8)
-        image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-        
-        if image is None:
-            return jsonify({'error': 'Invalid image data'}), 400
-        
-        # Process frame with face dumper
-        dump_results = face_dumper.process_frame(image)
+        # Decode at reduced resolution if the image is larger than needed
+        try:
+            image, scale = decode_base64_image(
+                image_data,
+                max_bytes=current_app.config['MAX_CONTENT_LENGTH'],
+                target_size=current_app.config['IMAGE_DECODE_TARGET_SIZE'],
+                max_pixels=current_app.config['MAX_IMAGE_PIXELS']
+            )
+        except ImageDecodeError as e:
+            return jsonify({'error': str(e)}), 400
         
-        # Get recognition results
-        faces, boxes = face_recognition_system.detect_faces(image)
-        
-        if not faces:
-            return jsonify({'faces': []})
-        
-        results = []
-        # Get all users and their face encodings
-        users = User.query.all()
-        
-        for face, box in zip(faces, boxes):
-            # Get embedding for detected face
-            embedding = face_recognition_system.get_face_embedding(face)
-            if embedding is None:
-                continue
-            
-            # Compare with stored faces
-            best_match = None
-            best_score = 0.0  # Convert to Python float
-            
-            for user in users:
-                for stored_encoding in user.face_encodings:
-                    stored_embedding = stored_encoding.get_encoding()
-                    score = float(face_recognition_system.compare_faces(embedding, stored_embedding))  # Convert to Python float
-                    
-                    if score > best_score:
-                        best_score = score
-                        best_match = user
-            
-            # Convert numpy int values to Python int
-            box = [int(x) for x in box]
-            
-            # Find matching dump result if any
-            dump_result = next((r for r in dump_results if r['box'] == box), None)
-            
-            # Add result
-            result = {
-                'box': box,
-                'recognized': bool(best_score > 0.6),  # Convert to Python bool
-                'name': best_match.name if best_match and best_score > 0.6 else 'Unknown',
-                'confidence': best_score,
-                'emotion': dump_result['emotion'] if dump_result else None,
-                'similarity': dump_result['similarity'] if dump_result else None
-            }
-            results.append(result)
+        # Inference runs on the bounded inference pool, database work on this thread
+        results = recognize_image(image, scale)
         
         return jsonify({'faces': results})
     
+    except (InferencePoolFull, EncodingVersionMismatch):
+        raise
     except Exception as e:
         print(f"Error in recognize_face: {str(e)}")
         return jsonify({'error': str(e)}), 500
@@ -151,7 +257,11 @@ def get_face_dumps():
                     'emotion': dump.emotion,
                     'similarity': dump.similarity_score,
                     'timestamp': dump.created_at.strftime('%Y%m%d_%H%M%S_%f'),
-                    'image_path': dump.face_image_path
+                    'image_path': dump.face_image_path,
+                    'image_url': url_for(
+                        'main.serve_dump',
+                        filename=face_dumper.storage.relative_path(dump.face_image_path)
+                    )
                 })
         
         return jsonify({'dumps': results})
@@ -160,6 +270,42 @@ def get_face_dumps():
         print(f"Error getting face dumps: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@main_bp.route('/api/face-dumps/stats', methods=['GET'])
+def get_face_dump_stats():
+    """
+    Get face dump write counters
+    
+    Returns:
+        JSON response with:
+        - dumps_written: Number of dumps written since startup
+        - dumps_suppressed: Number of near-duplicate dumps skipped since startup
+    """
+    return jsonify(face_dumper.get_stats())
+
+@main_bp.route('/api/inference/stats', methods=['GET'])
+def get_inference_stats():
+    """
+    Get inference pool, FaceNet micro-batching and detection cascade stats
+    
+    Returns:
+        JSON response with:
+        - backend: FaceNet inference backend
+        - encoding_version: Version of the embeddings produced and matched
+        - pool: Inference pool limits, pending and rejected jobs
+        - batching: Batch-size and queue-wait histograms, or null if batching is disabled
+        - cascade: Frames searched by crops, on the full frame or skipped, or null if
+                   the detection cascade is disabled
+    """
+    batcher = face_recognition_system.batcher
+    cascade = face_recognition_system.cascade
+    return jsonify({
+        'backend': face_recognition_system.backend,
+        'encoding_version': face_recognition_system.encoding_version,
+        'pool': inference_pool.get_stats(),
+        'batching': batcher.get_stats() if batcher is not None else None,
+        'cascade': cascade.get_stats() if cascade is not None else None
+    })
+
 @main_bp.route('/api/face-dumps', methods=['DELETE'])
 def delete_all_face_dumps():
     """
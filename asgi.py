@@ -0,0 +1,8 @@
+from app import create_app
+from app.asgi import create_asgi_app
+
+app = create_asgi_app(create_app())
+
+if __name__ == '__main__':
+    import uvicorn
+    uvicorn.run(app, host='0.0.0.0', port=5000)
@@ -0,0 +1,161 @@
+import sys
+import time
+import argparse
+from pathlib import Path
+import cv2
+import numpy as np
+
+# Add the parent directory to Python path
+current_dir = Path(__file__).resolve().parent
+parent_dir = current_dir.parent
+sys.path.append(str(parent_dir))
+
+from app.config import Config
+from app.models.detection_cascade import CASCADE_METHODS, DetectionCascade
+from app.models.face_recognition import FaceRecognitionSystem
+from app.models.inference_backend import configure_threads
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp', '.webp'}
+
+def load_images(image_dir, limit):
+    """
+    Load images from a directory, in file name order
+
+    Args:
+        image_dir (str): Directory searched recursively for images
+        limit (int): Maximum number of images to load
+
+    Returns:
+        list: BGR images
+    """
+    images = []
+    for path in sorted(Path(image_dir).rglob('*')):
+        if path.suffix.lower() not in IMAGE_EXTENSIONS:
+            continue
+        image = cv2.imread(str(path), cv2.IMREAD_COLOR)
+        if image is not None:
+            images.append(image)
+        if len(images) >= limit:
+            break
+    return images
+
+def iou(a, b):
+    """Intersection over union of two [x1, y1, x2, y2] boxes"""
+    width = min(a[2], b[2]) - max(a[0], b[0])
+    height = min(a[3], b[3]) - max(a[1], b[1])
+    if width <= 0 or height <= 0:
+        return 0.0
+    intersection = width * height
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - intersection
+    return intersection / union
+
+def count_matches(reference, candidates, threshold):
+    """
+    Greedily match candidate boxes to reference boxes
+
+    Args:
+        reference (list): Reference boxes
+        candidates (list): Candidate boxes
+        threshold (float): Minimum IoU of a match
+
+    Returns:
+        int: Number of reference boxes matched by a candidate
+    """
+    unmatched = list(candidates)
+    matches = 0
+    for box in reference:
+        scores = [iou(box, candidate) for candidate in unmatched]
+        if scores and max(scores) >= threshold:
+            del unmatched[int(np.argmax(scores))]
+            matches += 1
+    return matches
+
+def run_detector(system, images, repeats):
+    """
+    Time face detection on every image
+
+    Returns:
+        Tuple[list, list]: Boxes per image and milliseconds per image (best of repeats)
+    """
+    boxes, times = [], []
+    for image in images:
+        best = float('inf')
+        for _ in range(repeats):
+            started = time.perf_counter()
+            _, found = system.detect_faces(image)
+            best = min(best, time.perf_counter() - started)
+        boxes.append(found)
+        times.append(best * 1000)
+    return boxes, times
+
+def main():
+    """Compare recall and speed of detection cascades against MTCNN on full frames"""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('--images', required=True, help='Directory of test images (frames with and without faces)')
+    parser.add_argument('--limit', type=int, default=500, help='Maximum number of images to use')
+    parser.add_argument('--methods', nargs='+', default=['haar'], choices=CASCADE_METHODS)
+    parser.add_argument('--model', default=Config.DETECTION_CASCADE_MODEL,
+                        help='Cascade XML or DNN weights (required for lbp and dnn)')
+    parser.add_argument('--config', default=Config.DETECTION_CASCADE_CONFIG, help='DNN network description')
+    parser.add_argument('--padding', type=float, default=Config.DETECTION_CASCADE_PADDING)
+    parser.add_argument('--skip-empty', action='store_true', default=Config.DETECTION_CASCADE_SKIP_EMPTY,
+                        help='Skip MTCNN on frames where nothing is proposed')
+    parser.add_argument('--iou', type=float, default=0.5, help='Minimum IoU for a face to count as found')
+    parser.add_argument('--repeats', type=int, default=3, help='Timed runs per image, the fastest is kept')
+    parser.add_argument('--intra-op-threads', type=int, default=Config.INTRA_OP_THREADS)
+    parser.add_argument('--inter-op-threads', type=int, default=Config.INTER_OP_THREADS)
+    args = parser.parse_args()
+
+    images = load_images(args.images, args.limit)
+    if not images:
+        print(f"Error: No images found in {args.images}")
+        sys.exit(1)
+
+    configure_threads(args.intra_op_threads, args.inter_op_threads)
+    system = FaceRecognitionSystem()
+
+    # Warm up before timing
+    system.detect_faces(images[0])
+
+    # Faces found by MTCNN on full frames are the reference for recall
+    reference, baseline_times = run_detector(system, images, args.repeats)
+    total_faces = sum(len(boxes) for boxes in reference)
+    face_frames = sum(1 for boxes in reference if boxes)
+    baseline_ms = float(np.mean(baseline_times))
+    print(f"{len(images)} images, {total_faces} faces in {face_frames} frames found by MTCNN-only\n")
+
+    print(f"{'detector':<10} {'ms/frame':>9} {'p95 ms':>8} {'speedup':>8} {'recall':>7} "
+          f"{'missed':>7} {'extra':>6} {'full':>6} {'skipped':>8}")
+    print(f"{'mtcnn':<10} {baseline_ms:>9.1f} {np.percentile(baseline_times, 95):>8.1f} {1.0:>7.2f}x "
+          f"{1.0:>7.1%} {0:>7} {0:>6} {1.0:>6.0%} {0.0:>8.0%}")
+
+    for method in args.methods:
+        try:
+            system.cascade = DetectionCascade(
+                method,
+                model_path=args.model,
+                config_path=args.config,
+                padding=args.padding,
+                skip_empty=args.skip_empty
+            )
+        except ValueError as e:
+            print(f"{method:<10} skipped: {e}")
+            continue
+
+        found, times = run_detector(system, images, args.repeats)
+        matched = sum(count_matches(ref, boxes, args.iou) for ref, boxes in zip(reference, found))
+        missed_frames = sum(1 for ref, boxes in zip(reference, found) if ref and not boxes)
+        extra = sum(len(boxes) for boxes in found) - matched
+        stats = system.cascade.get_stats()
+        frames = stats['frames'] or 1
+        mean_ms = float(np.mean(times))
+
+        print(f"{method:<10} {mean_ms:>9.1f} {np.percentile(times, 95):>8.1f} {baseline_ms / mean_ms:>7.2f}x "
+              f"{matched / max(total_faces, 1):>7.1%} {missed_frames:>7} {extra:>6} "
+              f"{stats['full_frame'] / frames:>6.0%} {stats['skipped_empty'] / frames:>8.0%}")
+
+    print("\nrecall: MTCNN-only faces also found; missed: face frames where nothing was found;")
+    print("extra: faces not found by MTCNN-only; full/skipped: frames sent to MTCNN whole / skipped as empty")
+
+if __name__ == '__main__':
+    main()
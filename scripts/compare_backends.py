@@ -0,0 +1,110 @@
+import sys
+import argparse
+from pathlib import Path
+import cv2
+import torch
+
+# Add the parent directory to Python path
+current_dir = Path(__file__).resolve().parent
+parent_dir = current_dir.parent
+sys.path.append(str(parent_dir))
+
+from app.config import Config
+from app.models.face_recognition import FaceRecognitionSystem, encoding_version
+from app.models.inference_backend import BACKENDS, compare_backends, configure_threads
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp', '.webp'}
+
+def load_faces(system, image_dir, limit):
+    """
+    Detect faces in a directory of images and preprocess them for FaceNet
+
+    Args:
+        system (FaceRecognitionSystem): Eager face recognition system
+        image_dir (str): Directory searched recursively for images
+        limit (int): Maximum number of faces to load
+
+    Returns:
+        torch.Tensor: Faces of shape (N, 3, 160, 160)
+    """
+    faces = []
+    for path in sorted(Path(image_dir).rglob('*')):
+        if path.suffix.lower() not in IMAGE_EXTENSIONS:
+            continue
+        image = cv2.imread(str(path), cv2.IMREAD_COLOR)
+        if image is None:
+            continue
+        crops, _ = system.detect_faces(image)
+        faces.extend(system.preprocess_face(crop) for crop in crops)
+        if len(faces) >= limit:
+            break
+    return torch.stack(faces[:limit]) if faces else None
+
+def main():
+    """Compare FaceNet inference backends against the eager model"""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('--images', help='Directory of face images (random inputs if omitted)')
+    parser.add_argument('--limit', type=int, default=64, help='Maximum number of faces to use')
+    parser.add_argument('--backends', nargs='+', default=list(BACKENDS), choices=BACKENDS)
+    parser.add_argument('--tolerance', type=float, default=0.01, help='Maximum cosine distance to eager embeddings')
+    parser.add_argument('--repeats', type=int, default=5, help='Timed runs per backend')
+    parser.add_argument('--intra-op-threads', type=int, default=Config.INTRA_OP_THREADS)
+    parser.add_argument('--inter-op-threads', type=int, default=Config.INTER_OP_THREADS)
+    parser.add_argument('--onnx-path', default=Config.ONNX_MODEL_PATH)
+    args = parser.parse_args()
+
+    configure_threads(args.intra_op_threads, args.inter_op_threads)
+    system = FaceRecognitionSystem(device='cpu')
+
+    if args.images:
+        faces = load_faces(system, args.images, args.limit)
+        if faces is None:
+            print(f"Error: No faces found in {args.images}")
+            sys.exit(1)
+    else:
+        print("No image directory given, using random inputs (speed only, accuracy is not meaningful)")
+        faces = torch.rand(args.limit, 3, 160, 160)
+
+    print(f"Comparing {len(args.backends)} backends on {len(faces)} faces "
+          f"({torch.get_num_threads()} intra-op threads)\n")
+
+    backends = [b for b in args.backends if b != 'onnx' or _onnxruntime_available()]
+    results = compare_backends(
+        system.facenet,
+        faces,
+        backends,
+        onnx_path=args.onnx_path,
+        tolerance=args.tolerance,
+        repeats=args.repeats
+    )
+
+    print(f"{'backend':<12} {'ms/face':>10} {'mean dist':>12} {'max dist':>12}  ok")
+    for result in results:
+        print(f"{result['backend']:<12} {result['ms_per_face']:>10.2f} "
+              f"{result['mean_cosine_distance']:>12.2e} {result['max_cosine_distance']:>12.2e}  "
+              f"{'yes' if result['within_tolerance'] else 'no'}")
+
+    accepted = [r for r in results if r['within_tolerance']]
+    if accepted:
+        best = min(accepted, key=lambda r: r['ms_per_face'])
+        print(f"\nFastest backend within tolerance: {best['backend']}")
+        if encoding_version(best['backend']) == encoding_version(Config.INFERENCE_BACKEND):
+            print(f"Set INFERENCE_BACKEND={best['backend']} to use it")
+        else:
+            # Servers only match the active version, so the gallery has to be migrated first
+            print(f"It produces {encoding_version(best['backend'])} encodings. To use it, first re-encode the "
+                  f"gallery with: python scripts/reencode_gallery.py --backend {best['backend']}")
+            print(f"It switches the active version when done; then set INFERENCE_BACKEND={best['backend']} on every "
+                  f"server. Servers whose version is not the active one answer 503")
+
+def _onnxruntime_available():
+    """Check whether onnxruntime can be imported"""
+    try:
+        import onnxruntime  # noqa: F401
+        return True
+    except ImportError:
+        print("Skipping 'onnx' backend: onnxruntime is not installed")
+        return False
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+import os
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+import numpy as np
+
+# Add the parent directory to Python path
+current_dir = Path(__file__).resolve().parent
+parent_dir = current_dir.parent
+sys.path.append(str(parent_dir))
+
+from app.config import Config
+from app.models.face_recognition import FaceRecognitionSystem
+from app.models.inference_backend import BACKENDS
+from app.models.verification import (
+    EmbeddingCache, embed_dataset, error_rates, load_labeled_dataset, roc_summary, score_histograms
+)
+
+def main():
+    """Evaluate face verification accuracy and speed on a folder-per-identity dataset"""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('--dataset', required=True, help='Directory with one subdirectory of images per identity')
+    parser.add_argument('--limit-per-identity', type=int, help='Maximum images used per identity')
+    parser.add_argument('--backend', default=Config.INFERENCE_BACKEND, choices=BACKENDS)
+    parser.add_argument('--onnx-path', default=Config.ONNX_MODEL_PATH)
+    parser.add_argument('--cropped', action='store_true', help='Images are already cropped faces, skip detection')
+    parser.add_argument('--batch-size', type=int, default=64, help='Faces per FaceNet batch')
+    parser.add_argument('--block-size', type=int, default=4096, help='Embeddings per scoring block')
+    parser.add_argument('--cache-dir', default=os.path.join(parent_dir, 'models', 'verification_cache'),
+                        help='Directory for cached embeddings')
+    parser.add_argument('--no-cache', action='store_true', help='Embed every image again')
+    parser.add_argument('--thresholds', default='0.3,0.4,0.5,0.55,0.6,0.65,0.7,0.8',
+                        help='Comma separated thresholds for the FAR/FRR table')
+    parser.add_argument('--output', help='Write results as JSON to this file')
+    args = parser.parse_args()
+
+    items = load_labeled_dataset(args.dataset, args.limit_per_identity)
+    identities = len({identity for _, identity in items})
+    if not items:
+        print(f"Error: No images found in {args.dataset}")
+        sys.exit(1)
+    print(f"Dataset: {len(items)} images of {identities} identities")
+
+    system = FaceRecognitionSystem(backend=args.backend, onnx_path=args.onnx_path)
+
+    cache = None
+    if not args.no_cache:
+        dataset_name = Path(args.dataset).resolve().name
+        mode = 'cropped' if args.cropped else 'detected'
+        cache = EmbeddingCache(
+            os.path.join(args.cache_dir, f"{dataset_name}-{args.backend}-{system.encoding_version}-{mode}.npz"),
+            version=system.encoding_version
+        )
+
+    embeddings, labels, embed_stats = embed_dataset(
+        system, args.dataset, items, cache=cache, batch_size=args.batch_size, detect=not args.cropped
+    )
+    if cache is not None:
+        cache.save()
+
+    print(f"Embedded {embed_stats['embedded']} faces, {embed_stats['cached']} from cache, "
+          f"{embed_stats['no_face']} images without a face")
+    if embed_stats['detect_seconds']:
+        print(f"  Detection: {embed_stats['detected'] / embed_stats['detect_seconds']:.1f} images/s")
+    if embed_stats['embed_seconds']:
+        print(f"  Embedding: {embed_stats['embedded'] / embed_stats['embed_seconds']:.1f} faces/s "
+              f"(batches of {args.batch_size}, {args.backend} backend)")
+
+    if len(embeddings) < 2:
+        print("Error: Need at least two embedded faces")
+        sys.exit(1)
+
+    started = time.perf_counter()
+    genuine, impostor = score_histograms(embeddings, labels, block_size=args.block_size)
+    scoring_seconds = time.perf_counter() - started
+    pairs = int(genuine.sum() + impostor.sum())
+    print(f"Scored {pairs:,} pairs ({int(genuine.sum()):,} genuine, {int(impostor.sum()):,} impostor) "
+          f"in {scoring_seconds:.2f}s, {pairs / max(scoring_seconds, 1e-9) / 1e6:.1f}M pairs/s\n")
+
+    thresholds = [float(t) for t in args.thresholds.split(',')]
+    if Config.FACE_RECOGNITION_THRESHOLD not in thresholds:
+        thresholds = sorted(thresholds + [Config.FACE_RECOGNITION_THRESHOLD])
+    table = error_rates(genuine, impostor, thresholds)
+
+    print(f"{'threshold':>9} {'FAR':>10} {'FRR':>8} {'TAR':>8}")
+    for row in table:
+        marker = '  <- FACE_RECOGNITION_THRESHOLD' if row['threshold'] == Config.FACE_RECOGNITION_THRESHOLD else ''
+        print(f"{row['threshold']:>9.3f} {row['far']:>10.6f} {row['frr']:>8.4f} {row['tar']:>8.4f}{marker}")
+
+    summary = roc_summary(genuine, impostor)
+    print(f"\nEER {summary['eer']:.4f} at threshold {summary['eer_threshold']:.3f}")
+    for point in summary['operating_points']:
+        print(f"FAR {point['far']:g}: threshold {point['threshold']:.3f}, TAR {point['tar']:.4f}")
+
+    if args.output:
+        bins = len(genuine)
+        with open(args.output, 'w') as f:
+            json.dump({
+                'dataset': {'images': len(items), 'identities': identities, 'faces': len(embeddings)},
+                'backend': args.backend,
+                'embedding': embed_stats,
+                'scoring': {'pairs': pairs, 'seconds': scoring_seconds},
+                'error_rates': table,
+                'roc': summary,
+                'histograms': {
+                    'bin_edges': (np.arange(bins + 1) * (2.0 / bins) - 1.0).tolist(),
+                    'genuine': genuine.tolist(),
+                    'impostor': impostor.tolist()
+                }
+            }, f, indent=2)
+
+if __name__ == '__main__':
+    main()
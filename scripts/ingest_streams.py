@@ -0,0 +1,82 @@
+import sys
+import time
+import argparse
+from pathlib import Path
+
+# Add the parent directory to Python path
+current_dir = Path(__file__).resolve().parent
+parent_dir = current_dir.parent
+sys.path.append(str(parent_dir))
+
+from app import create_app
+from app.models.stream_ingest import StreamIngestionService
+
+def parse_source(index, value):
+    """
+    Parse a camera argument of the form NAME=SOURCE or SOURCE
+
+    Args:
+        index (int): Position of the camera argument
+        value (str): Camera argument
+
+    Returns:
+        Tuple[str, str]: Camera name and source
+    """
+    name, sep, source = value.partition('=')
+    # URLs such as rtsp://host/path?x=1 contain '=' but not as a name separator
+    if not sep or '://' in name:
+        return f'cam{index}', value
+    return name, source
+
+def print_results(camera, results):
+    """Print faces dumped from a camera"""
+    for result in results:
+        status = 'suppressed' if result.get('suppressed') else 'dumped'
+        print(f"[{camera}] {result['name']} ({result['emotion']}, "
+              f"{result['similarity']:.2f}) {status}")
+
+def main():
+    """Ingest faces from camera streams, video files or local devices"""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('sources', nargs='+',
+                        help='Camera sources as NAME=SOURCE or SOURCE (RTSP URL, video file or device index)')
+    parser.add_argument('--dump-interval', type=float, default=0,
+                        help='Minimum seconds between dumps per camera (near-duplicates are suppressed regardless)')
+    parser.add_argument('--buffer-size', type=int, default=1, help='Latest frames kept per camera')
+    parser.add_argument('--no-loop', action='store_true', help='Stop video files at the end instead of looping')
+    parser.add_argument('--report-interval', type=float, default=10, help='Seconds between stats reports')
+    parser.add_argument('--verbose', action='store_true', help='Print every dumped face')
+    args = parser.parse_args()
+
+    app = create_app()
+
+    # Reuse the app's face dumper so no extra model copies are loaded
+    from app.routes.main import face_dumper
+    face_dumper.dump_interval = args.dump_interval
+
+    service = StreamIngestionService(app, face_dumper, on_results=print_results if args.verbose else None)
+    for index, value in enumerate(args.sources):
+        name, source = parse_source(index, value)
+        service.add_camera(name, source, buffer_size=args.buffer_size, loop=not args.no_loop)
+
+    print(f"Ingesting {len(service.cameras)} cameras, press Ctrl+C to stop")
+    service.start()
+
+    try:
+        while True:
+            time.sleep(args.report_interval)
+            print(f"\n{'camera':<16} {'capture fps':>12} {'processed fps':>14} {'throttled':>10} {'dropped':>8} "
+                  f"{'avg lag ms':>11} {'max lag ms':>11}")
+            for stats in service.get_stats():
+                status = '' if stats['connected'] else '  (disconnected)'
+                print(f"{stats['camera']:<16} {stats['capture_fps']:>12.1f} {stats['processed_fps']:>14.1f} "
+                      f"{stats['throttled']:>10} {stats['dropped']:>8} {stats['avg_lag_ms']:>11.1f} {stats['max_lag_ms']:>11.1f}{status}")
+            dump_stats = face_dumper.get_stats()
+            print(f"dumps written: {dump_stats['dumps_written']}, suppressed: {dump_stats['dumps_suppressed']}")
+    except KeyboardInterrupt:
+        print("\nStopping...")
+    finally:
+        service.stop()
+
+if __name__ == '__main__':
+    main()
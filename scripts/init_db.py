@@ -48,11 +48,15 @@ def init_db():
                     'id', 'name', 'created_at', 'updated_at'
                 ],
                 'face_encodings': [
-                    'id', 'user_id', 'encoding_vector', 'created_at'
+                    'id', 'user_id', 'encoding_vector', 'model_version',
+                    'source_image_path', 'created_at'
                 ],
                 'face_dumps': [
                     'id', 'user_id', 'face_image_path', 'bounding_box',
-                    'emotion', 'similarity_score', 'created_at'
+                    'emotion', 'similarity_score', 'embedding', 'model_version', 'created_at'
+                ],
+                'encoding_versions': [
+                    'version', 'is_active', 'created_at', 'activated_at'
                 ]
             }
             
@@ -80,6 +84,8 @@ def init_db():
             print("  - id (Integer, Primary Key)")
             print("  - user_id (Integer, Foreign Key to users.id)")
             print("  - encoding_vector (LargeBinary, Not Null)")
+            print("  - model_version (String(64), Not Null)")
+            print("  - source_image_path (String(255), retained enrollment image)")
             print("  - created_at (DateTime)")
             print("\nTable: face_dumps")
             print("  - id (Integer, Primary Key)")
@@ -88,7 +94,14 @@ def init_db():
             print("  - bounding_box (String(100), Not Null)")
             print("  - emotion (String(50), Not Null)")
             print("  - similarity_score (Float, Not Null)")
+            print("  - embedding (LargeBinary, float16 probe embedding)")
+            print("  - model_version (String(64), Not Null)")
+            print("  - created_at (DateTime)")
+            print("\nTable: encoding_versions")
+            print("  - version (String(64), Primary Key)")
+            print("  - is_active (Boolean, Not Null)")
             print("  - created_at (DateTime)")
+            print("  - activated_at (DateTime)")
             
             return True
             
@@ -0,0 +1,352 @@
+import os
+import sys
+import json
+import time
+import base64
+import random
+import argparse
+import tempfile
+import threading
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+# Add the parent directory to Python path
+current_dir = Path(__file__).resolve().parent
+parent_dir = current_dir.parent
+sys.path.append(str(parent_dir))
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp', '.webp'}
+
+def percentile(values, fraction):
+    """
+    Get a percentile of a list of values by nearest rank
+
+    Args:
+        values (list): Values to summarize
+        fraction (float): Percentile as a fraction (e.g. 0.95)
+
+    Returns:
+        float: The percentile, or 0.0 for an empty list
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))
+    return ordered[index]
+
+def load_frames(frame_dir):
+    """
+    Load recorded frames as base64 strings, in file name order
+
+    Args:
+        frame_dir (str): Directory searched recursively for images
+
+    Returns:
+        list: Base64 encoded frames
+    """
+    frames = []
+    for path in sorted(Path(frame_dir).rglob('*')):
+        if path.suffix.lower() in IMAGE_EXTENSIONS:
+            frames.append(base64.b64encode(path.read_bytes()).decode('ascii'))
+    return frames
+
+def synthetic_frames(count, width=640, height=480, seed=0):
+    """
+    Draw simple synthetic face-like frames as base64 JPEGs
+
+    Args:
+        count (int): Number of frames
+        width (int): Frame width
+        height (int): Frame height
+        seed (int): Random seed
+
+    Returns:
+        list: Base64 encoded frames
+    """
+    import cv2
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    frames = []
+    for _ in range(count):
+        image = rng.integers(40, 90, size=(height, width, 3), dtype=np.uint8)
+        cx = width // 2 + int(rng.integers(-width // 10, width // 10))
+        cy = height // 2 + int(rng.integers(-height // 10, height // 10))
+        size = int(rng.integers(height // 6, height // 4))
+        skin = tuple(int(c) for c in rng.integers(120, 220, size=3))
+        cv2.ellipse(image, (cx, cy), (size, int(size * 1.3)), 0, 0, 360, skin, -1)
+        for dx in (-size // 3, size // 3):
+            cv2.circle(image, (cx + dx, cy - size // 4), size // 8, (40, 40, 40), -1)
+        cv2.ellipse(image, (cx, cy + size // 2), (size // 3, size // 8), 0, 0, 180, (60, 40, 120), 3)
+        ok, buffer = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, 80])
+        frames.append(base64.b64encode(buffer.tobytes()).decode('ascii'))
+    return frames
+
+class InProcessClient:
+    """HTTP-free client calling the Flask app through its test client, one per thread"""
+
+    def __init__(self, app):
+        self.app = app
+        self._local = threading.local()
+
+    def request(self, method, path, payload=None):
+        """
+        Send a request
+
+        Returns:
+            int: HTTP status code
+        """
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        response = client.open(path, method=method, json=payload)
+        response.close()
+        return response.status_code
+
+class HttpClient:
+    """Client sending requests to a running server over HTTP"""
+
+    def __init__(self, base_url, timeout=30):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+
+    def request(self, method, path, payload=None):
+        """
+        Send a request
+
+        Returns:
+            int: HTTP status code
+        """
+        data = json.dumps(payload).encode('utf-8') if payload is not None else None
+        request = urllib.request.Request(self.base_url + path, data=data, method=method,
+                                         headers={'Content-Type': 'application/json'} if data else {})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as e:
+            return e.code
+
+ADMIN_PATHS = ('/admin/users?limit=50', '/api/face-dumps')
+
+def run_camera(client, frames, offset, fps, admin_ratio, deadline, samples, lock):
+    """
+    Simulate one camera posting frames at a fixed rate until the deadline
+
+    Latency is measured from each request's scheduled send time, so a slow
+    server that delays later sends is not hidden (no coordinated omission).
+
+    Args:
+        client (InProcessClient | HttpClient): Request client
+        frames (list): Base64 encoded frames
+        offset (int): Index of this camera's first frame
+        fps (float): Frames per second to send
+        admin_ratio (float): Fraction of requests sent to admin/listing endpoints instead
+        deadline (float): Time to stop (time.monotonic)
+        samples (list): Shared list receiving (kind, status, latency) tuples
+        lock (threading.Lock): Lock guarding samples
+    """
+    rng = random.Random(offset)
+    interval = 1.0 / fps
+    # Spread camera start times over one interval
+    scheduled = time.monotonic() + rng.random() * interval
+    index = offset
+
+    while scheduled < deadline:
+        delay = scheduled - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+        if rng.random() < admin_ratio:
+            kind, method, path, payload = 'admin', 'GET', rng.choice(ADMIN_PATHS), None
+        else:
+            kind, method, path = 'recognize', 'POST', '/api/recognize'
+            payload = {'image': frames[index % len(frames)]}
+            index += 1
+
+        try:
+            status = client.request(method, path, payload)
+        except Exception:
+            status = 0
+        latency = time.monotonic() - scheduled
+
+        with lock:
+            samples.append((kind, status, latency))
+        scheduled += interval
+
+def run_stage(client, frames, cameras, fps, duration, admin_ratio):
+    """
+    Run one load stage with a fixed number of simulated cameras
+
+    Returns:
+        dict: Offered rate, throughput, latency percentiles and error counts
+    """
+    samples = []
+    lock = threading.Lock()
+    started = time.monotonic()
+    deadline = started + duration
+    threads = [
+        threading.Thread(target=run_camera,
+                         args=(client, frames, i * 7, fps, admin_ratio, deadline, samples, lock),
+                         daemon=True)
+        for i in range(cameras)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    latencies = [latency * 1000 for _, _, latency in samples]
+    errors = sum(1 for _, status, _ in samples if not 200 <= status < 300)
+    recognize = [latency * 1000 for kind, _, latency in samples if kind == 'recognize']
+    return {
+        'cameras': cameras,
+        'offered_rps': cameras * fps,
+        'requests': len(samples),
+        'throughput_rps': len(samples) / elapsed,
+        'error_rate': errors / len(samples) if samples else 0.0,
+        'rejected_503': sum(1 for _, status, _ in samples if status == 503),
+        'p50_ms': percentile(latencies, 0.50),
+        'p95_ms': percentile(latencies, 0.95),
+        'p99_ms': percentile(latencies, 0.99),
+        'recognize_p95_ms': percentile(recognize, 0.95)
+    }
+
+def is_saturated(stage, slo_ms, max_error_rate):
+    """Check whether a stage missed its offered rate, latency SLO or error budget"""
+    return (stage['throughput_rps'] < 0.9 * stage['offered_rps']
+            or stage['p95_ms'] > slo_ms
+            or stage['error_rate'] > max_error_rate)
+
+def seed_database(app, users, encodings_per_user):
+    """
+    Create tables and seed random users and encodings, of the active version, if the database is empty
+
+    Args:
+        app (Flask): Application
+        users (int): Number of users to create
+        encodings_per_user (int): Face encodings per user
+    """
+    import numpy as np
+    from app import face_recognition_system
+    from app.models.database import db, User, FaceEncoding, EncodingVersion
+
+    with app.app_context():
+        db.create_all()
+        if User.query.first() is not None:
+            return
+
+        rng = np.random.default_rng(0)
+        user_objects = [User(name=f'Load Test User {i}') for i in range(users)]
+        db.session.add_all(user_objects)
+        db.session.flush()
+
+        rows = []
+        for user in user_objects:
+            for vector in rng.standard_normal((encodings_per_user, 512)).astype(np.float32):
+                rows.append({
+                    'user_id': user.id,
+                    'encoding_vector': (vector / np.linalg.norm(vector)).tobytes(),
+                    'model_version': face_recognition_system.encoding_version
+                })
+        db.session.execute(db.insert(FaceEncoding), rows)
+        # Servers only match against the active version; activate() commits
+        EncodingVersion.activate(face_recognition_system.encoding_version)
+        print(f"Seeded {users} users with {len(rows)} encodings")
+
+def create_in_process_client(args):
+    """
+    Configure the environment, create the app in-process and seed its database
+
+    Returns:
+        InProcessClient: Client calling the app directly
+    """
+    workdir = tempfile.mkdtemp(prefix='face-loadtest-')
+    os.environ['DATABASE_URL'] = args.database_url or f"sqlite:///{os.path.join(workdir, 'loadtest.db')}"
+    os.environ.setdefault('DUMP_FOLDER', os.path.join(workdir, 'dumps'))
+    if args.stub_models:
+        os.environ['USE_MODEL_STUBS'] = '1'
+        os.environ['STUB_DETECT_MS'] = str(args.stub_detect_ms)
+        os.environ['STUB_EMBED_MS'] = str(args.stub_embed_ms)
+
+    # Config reads the environment on import
+    from app import create_app
+
+    app = create_app()
+    seed_database(app, args.seed_users, args.encodings_per_user)
+    print(f"In-process app, database {os.environ['DATABASE_URL']}"
+          f"{', stub models' if args.stub_models else ''}")
+    return InProcessClient(app)
+
+def main():
+    """Drive /api/recognize and the admin endpoints with simulated cameras"""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('--url', help='Base URL of a running server (default: run the app in-process)')
+    parser.add_argument('--frames', help='Directory of recorded frames to replay (default: synthetic faces)')
+    parser.add_argument('--synthetic', type=int, default=32, help='Number of synthetic frames to generate')
+    parser.add_argument('--cameras', default='1,2,4,8,16',
+                        help='Comma separated camera counts, one stage per count')
+    parser.add_argument('--fps', type=float, default=2.0, help='Frames per second per camera')
+    parser.add_argument('--duration', type=float, default=20.0, help='Seconds per stage')
+    parser.add_argument('--admin-ratio', type=float, default=0.05,
+                        help='Fraction of requests sent to admin and listing endpoints')
+    parser.add_argument('--slo-ms', type=float, default=1000.0, help='p95 latency above which a stage is saturated')
+    parser.add_argument('--max-error-rate', type=float, default=0.01,
+                        help='Error rate above which a stage is saturated')
+    parser.add_argument('--database-url', help='Database for the in-process app (default: temporary SQLite file)')
+    parser.add_argument('--seed-users', type=int, default=100, help='Users seeded into an empty database')
+    parser.add_argument('--encodings-per-user', type=int, default=2, help='Encodings seeded per user')
+    parser.add_argument('--stub-models', action='store_true', help='Replace models with stubs (in-process only)')
+    parser.add_argument('--stub-detect-ms', type=float, default=0.0, help='Simulated detection time per frame')
+    parser.add_argument('--stub-embed-ms', type=float, default=0.0, help='Simulated embedding time per face')
+    parser.add_argument('--output', help='Write stage results as JSON to this file')
+    args = parser.parse_args()
+
+    if args.url:
+        if args.stub_models:
+            print("Note: --stub-models only applies in-process; start the server with USE_MODEL_STUBS=1 instead")
+        client = HttpClient(args.url)
+    else:
+        client = create_in_process_client(args)
+
+    frames = load_frames(args.frames) if args.frames else synthetic_frames(args.synthetic)
+    if not frames:
+        print(f"Error: No frames found in {args.frames}")
+        sys.exit(1)
+    print(f"Replaying {len(frames)} frames at {args.fps} fps per camera, {args.duration}s per stage\n")
+
+    header = (f"{'cameras':>7} {'offered/s':>10} {'done/s':>8} {'errors':>7} {'503':>5} "
+              f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    print(header)
+
+    stages = []
+    saturation = None
+    for cameras in (int(c) for c in args.cameras.split(',')):
+        stage = run_stage(client, frames, cameras, args.fps, args.duration, args.admin_ratio)
+        stages.append(stage)
+        saturated = is_saturated(stage, args.slo_ms, args.max_error_rate)
+        print(f"{stage['cameras']:>7} {stage['offered_rps']:>10.1f} {stage['throughput_rps']:>8.1f} "
+              f"{stage['error_rate']:>7.1%} {stage['rejected_503']:>5} {stage['p50_ms']:>8.1f} "
+              f"{stage['p95_ms']:>8.1f} {stage['p99_ms']:>8.1f}{'  saturated' if saturated else ''}")
+        if saturated and saturation is None:
+            saturation = stage
+
+    healthy = [stage for stage in stages if not is_saturated(stage, args.slo_ms, args.max_error_rate)]
+    print()
+    if healthy:
+        best = max(healthy, key=lambda stage: stage['throughput_rps'])
+        print(f"Sustained {best['throughput_rps']:.1f} req/s with {best['cameras']} cameras "
+              f"(p95 {best['p95_ms']:.0f} ms)")
+    if saturation:
+        print(f"Saturated at {saturation['cameras']} cameras ({saturation['offered_rps']:.1f} req/s offered)")
+    else:
+        print("Not saturated, add more cameras or frames per second")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'stages': stages, 'saturation_cameras': saturation['cameras'] if saturation else None}, f, indent=2)
+
+if __name__ == '__main__':
+    main()
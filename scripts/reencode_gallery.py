@@ -0,0 +1,108 @@
+import os
+import sys
+import argparse
+from pathlib import Path
+
+# Add the parent directory to Python path
+current_dir = Path(__file__).resolve().parent
+parent_dir = current_dir.parent
+sys.path.append(str(parent_dir))
+
+def parse_args():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(
+        description="Re-encode the face gallery from retained enrollment images with the configured "
+                    "model. The model is configured as for serving (INFERENCE_BACKEND, ...), "
+                    "so run this with the environment of the new deployment."
+    )
+    parser.add_argument('--backend', help='FaceNet inference backend to encode with (sets INFERENCE_BACKEND)')
+    parser.add_argument('--workers', type=int, default=max(1, (os.cpu_count() or 2) // 2),
+                        help='Worker processes, each loading its own models')
+    parser.add_argument('--threads-per-worker', type=int, default=2, help='CPU threads per worker (INTRA_OP_THREADS)')
+    parser.add_argument('--batch-size', type=int, default=32, help='Images per FaceNet batch')
+    parser.add_argument('--chunk-size', type=int, default=1024, help='Source encodings read per query')
+    parser.add_argument('--source-version', help='Version to re-encode from (default: the active version)')
+    parser.add_argument('--no-switch', action='store_true', help='Do not activate the new version')
+    parser.add_argument('--force-switch', action='store_true',
+                        help='Activate the new version even if some images could not be re-encoded or '
+                             'some encodings have no retained image (their faces stop being recognized)')
+    parser.add_argument('--prune', action='store_true',
+                        help='Do not re-encode; delete the encodings of all versions but the active one, '
+                             'and enrollment images only they use. Run once every server is redeployed')
+    return parser.parse_args()
+
+def main():
+    """Re-encode the gallery and switch the active encoding version, or prune old versions"""
+    args = parse_args()
+
+    # Config reads the environment on import, and spawned workers inherit it
+    if args.backend:
+        os.environ['INFERENCE_BACKEND'] = args.backend
+    os.environ['INTRA_OP_THREADS'] = str(args.threads_per_worker)
+    os.environ['INTER_OP_THREADS'] = '1'
+    os.environ['FACENET_BATCH_WINDOW_MS'] = '0'
+
+    from app import create_app, face_recognition_system
+    from app.config import Config
+    from app.models.database import EncodingVersion
+    from app.models.reencode import prune_encodings, reencode_gallery
+
+    target_version = face_recognition_system.encoding_version
+
+    def report(stats):
+        done = stats['encoded'] + stats['failed']
+        print(f"\r  {done}/{stats['pending']} images, {stats['encoded']} encoded, {stats['failed']} failed",
+              end='', flush=True)
+
+    app = create_app()
+    with app.app_context():
+        if args.prune:
+            # Only with the active version's configuration, and never in the switching run
+            try:
+                deleted, removed = prune_encodings(target_version, Config.ENROLLMENT_FOLDER)
+            except ValueError as e:
+                print(f"Error: {e}")
+                sys.exit(1)
+            print(f"Pruned {deleted} encodings of other versions and {removed} enrollment images only they used")
+            return
+
+        source_version = args.source_version or EncodingVersion.active_version()
+        print(f"Re-encoding {source_version} -> {target_version} with {args.workers} workers")
+
+        try:
+            stats = reencode_gallery(
+                target_version,
+                Config.ENROLLMENT_FOLDER,
+                source_version=source_version,
+                workers=args.workers,
+                batch_size=args.batch_size,
+                chunk_size=args.chunk_size,
+                target_size=Config.IMAGE_DECODE_TARGET_SIZE,
+                max_pixels=Config.MAX_IMAGE_PIXELS,
+                switch=not args.no_switch,
+                force_switch=args.force_switch,
+                progress=report
+            )
+        except ValueError as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+
+        print()
+        for key, value in stats.items():
+            print(f"  {key}: {value}")
+
+        if stats['switched']:
+            print(f"Active encoding version is now {target_version}. Servers of other versions answer 503 "
+                  f"until redeployed; once all are, run again with --prune to delete the old encodings")
+            if stats['without_source']:
+                print(f"Warning: {stats['without_source']} encodings had no retained image and are no longer "
+                      f"matched; re-enroll their users")
+        elif not args.no_switch and stats['remaining']:
+            print(f"Not switched: {stats['remaining']} images still lack a {target_version} encoding. "
+                  f"Run again to retry, or use --force-switch")
+        elif not args.no_switch:
+            print(f"Not switched: {stats['without_source']} encodings have no retained image and cannot be "
+                  f"re-encoded. Re-enroll their users, or use --force-switch to stop matching them")
+
+if __name__ == '__main__':
+    main()
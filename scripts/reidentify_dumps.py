@@ -0,0 +1,50 @@
+import sys
+import argparse
+from datetime import datetime
+from pathlib import Path
+
+# Add the parent directory to Python path
+current_dir = Path(__file__).resolve().parent
+parent_dir = current_dir.parent
+sys.path.append(str(parent_dir))
+
+from app import create_app
+from app.models.database import EncodingVersion
+from app.models.gallery import load_gallery
+from app.models.reidentify import reidentify_dumps
+
+def main():
+    """Re-match stored face dumps against the current face encodings"""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('--user-id', type=int, help='Only re-match dumps currently assigned to this user')
+    parser.add_argument('--since', type=datetime.fromisoformat, help='Only dumps created at or after this time (ISO format)')
+    parser.add_argument('--until', type=datetime.fromisoformat, help='Only dumps created before this time (ISO format)')
+    parser.add_argument('--min-score', type=float, default=0.0,
+                        help='Leave dumps unchanged if their best match scores below this')
+    parser.add_argument('--chunk-size', type=int, default=2048, help='Dumps scored per chunk')
+    parser.add_argument('--version', help='Encoding version to re-match (default: the active version)')
+    parser.add_argument('--dry-run', action='store_true', help='Report changes without writing them')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        gallery = load_gallery(model_version=args.version or EncodingVersion.active_version())
+        print(f"Loaded {gallery.model_version} gallery with {len(gallery)} encodings of "
+              f"{len(gallery.user_names)} users")
+
+        stats = reidentify_dumps(
+            gallery,
+            user_id=args.user_id,
+            since=args.since,
+            until=args.until,
+            min_score=args.min_score,
+            chunk_size=args.chunk_size,
+            dry_run=args.dry_run
+        )
+
+    print("Dry run, nothing written" if args.dry_run else "Re-identification complete")
+    for key, value in stats.items():
+        print(f"  {key}: {value}")
+
+if __name__ == '__main__':
+    main()
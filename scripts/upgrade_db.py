@@ -0,0 +1,103 @@
+import sys
+from pathlib import Path
+from dotenv import load_dotenv
+from sqlalchemy.exc import SQLAlchemyError
+
+# Add the parent directory to Python path
+current_dir = Path(__file__).resolve().parent
+parent_dir = current_dir.parent
+sys.path.append(str(parent_dir))
+
+from app import create_app
+from app.models.database import db, EncodingVersion, LEGACY_ENCODING_VERSION
+
+def add_missing_columns(inspector, table) -> list:
+    """
+    Add the model columns a table lacks
+
+    New columns are either nullable or have a server default, so existing
+    rows are filled in by the database.
+
+    Args:
+        inspector (Inspector): Inspector of the database
+        table (Table): Model table
+
+    Returns:
+        list: Names of the added columns
+    """
+    dialect = db.engine.dialect
+    quote = dialect.identifier_preparer.quote
+    existing = {column['name'] for column in inspector.get_columns(table.name)}
+
+    added = []
+    for column in table.columns:
+        if column.name in existing:
+            continue
+        ddl = f"ALTER TABLE {quote(table.name)} ADD COLUMN {quote(column.name)} {column.type.compile(dialect=dialect)}"
+        if column.server_default is not None:
+            ddl += f" DEFAULT '{column.server_default.arg}'"
+        if not column.nullable:
+            ddl += " NOT NULL"
+        db.session.execute(db.text(ddl))
+        added.append(column.name)
+    return added
+
+def add_missing_indexes(inspector, table) -> list:
+    """
+    Create the model indexes a table lacks
+
+    Args:
+        inspector (Inspector): Inspector of the database
+        table (Table): Model table
+
+    Returns:
+        list: Names of the created indexes
+    """
+    existing = {index['name'] for index in inspector.get_indexes(table.name)}
+
+    created = []
+    for index in table.indexes:
+        if index.name in existing:
+            continue
+        index.create(db.session.connection())
+        created.append(index.name)
+    return created
+
+def upgrade_db():
+    """
+    Bring an existing database up to the current models
+
+    Safe to run repeatedly: missing tables are created, missing columns and
+    indexes are added, and if no encoding version was ever activated, the
+    version of encodings stored before versioning is made active.
+    """
+    load_dotenv()
+    app = create_app()
+
+    with app.app_context():
+        try:
+            # New tables, such as encoding_versions
+            db.create_all()
+
+            inspector = db.inspect(db.engine)
+            for table in db.metadata.sorted_tables:
+                for name in add_missing_columns(inspector, table):
+                    print(f"Added column {table.name}.{name}")
+                for name in add_missing_indexes(inspector, table):
+                    print(f"Created index {name} on {table.name}")
+            db.session.commit()
+
+            if db.session.query(EncodingVersion).filter(EncodingVersion.is_active.is_(True)).first() is None:
+                EncodingVersion.activate(LEGACY_ENCODING_VERSION)
+                print(f"Active encoding version set to {LEGACY_ENCODING_VERSION}")
+
+            print("Database is up to date")
+
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            print("\nError: Database upgrade failed!")
+            print("SQLAlchemy Error:", str(e))
+            sys.exit(1)
+
+if __name__ == '__main__':
+    upgrade_db()